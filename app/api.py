@@ -0,0 +1,232 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import cached_json, table_versions
+from app.currency import RATE_TABLES, get_currency_converter
+from app.settings import settings
+from app.snapshot import get_location_snapshot
+from db import models
+from db.main import get_db
+from geoutils import RoutePlanner
+
+router = APIRouter(prefix="/api")
+route_planner = RoutePlanner()
+
+# Tables each response is built from; they make up its ETag validator.
+# Reviews are covered by the summaries they are aggregated into.
+CAFE_TABLES = {
+    "cities",
+    "geodatas",
+    "cafes",
+    "companies",
+    "cafe_summaries",
+    "cafe_price_summaries",
+}
+GEODATA_TABLES = {"geodatas", "cafes"}
+MENU_TABLES = {
+    "cafes",
+    "menus",
+    "menu_entries",
+    "currencies",
+    "currency_rates",
+}
+
+
+def serialize_geodata(geodata):
+    return {
+        "id": geodata.id,
+        "address": geodata.address,
+        "latitude": float(geodata.latitude),
+        "longitude": float(geodata.longitude),
+        "city_id": geodata.city_id,
+        "country_id": geodata.country_id,
+    }
+
+
+def serialize_summary(summary):
+    if summary is None:
+        return None
+    return {
+        "entry_count": summary.entry_count,
+        "review_count": summary.review_count,
+        "rating_avg": summary.rating_avg,
+        "prices": [
+            {
+                "currency_id": price.currency_id,
+                "entry_count": price.entry_count,
+                "min": price.price_min,
+                "avg": price.price_avg,
+                "max": price.price_max,
+            }
+            for price in summary.prices
+        ],
+    }
+
+
+def serialize_cafe(cafe, summary=None):
+    return {
+        "id": cafe.id,
+        "company_id": cafe.company_id,
+        "company": cafe.company.name if cafe.company else None,
+        "company_ru": cafe.company.name_ru if cafe.company else None,
+        "geodata": serialize_geodata(cafe.geodata) if cafe.geodata else None,
+        "summary": serialize_summary(summary),
+    }
+
+
+@router.get("/cities/{city}/cafes")
+async def city_cafes(
+    request: Request,
+    city: str,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    async def build():
+        cafes = await models.City.get_cafes(db, city, skip, limit)
+        summaries = await models.CafeSummary.get_for_cafes(
+            db, [cafe.id for cafe in cafes]
+        )
+        return [serialize_cafe(cafe, summaries.get(cafe.id)) for cafe in cafes]
+
+    return await cached_json(request, db, CAFE_TABLES, build)
+
+
+@router.get("/geodata")
+async def geodata(
+    request: Request,
+    country: int,
+    city: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    async def build():
+        return [
+            serialize_geodata(geodata) | {"cafe_id": geodata.cafe_id}
+            for geodata in await models.Geodata.get_all(
+                db, country, city, skip, limit
+            )
+        ]
+
+    return await cached_json(request, db, GEODATA_TABLES, build)
+
+
+@router.get("/cafes/{cafe_id}/menu")
+async def cafe_menu(
+    request: Request,
+    cafe_id: str,
+    currency: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    async def build():
+        menu = await models.Menu.get_by_cafe(db, cafe_id)
+        if menu is None:
+            raise HTTPException(status_code=404, detail="Menu not found")
+        entries = menu.entries
+        converted = [None] * len(entries)
+        if currency:
+            # The ETag covers the rate tables, so the body is converted
+            # with rates at least as new as the ones it names.
+            converter = await get_currency_converter(
+                await table_versions(db, RATE_TABLES)
+            )
+            try:
+                converted = converter.convert_entries(entries, currency)
+            except KeyError as e:
+                raise HTTPException(status_code=400, detail=e.args[0]) from e
+        return {
+            "id": menu.id,
+            "cafe_id": menu.cafe_id,
+            "entries": [
+                {
+                    "id": entry.id,
+                    "name": entry.name,
+                    "description_ru": entry.description_ru,
+                    "price": entry.price,
+                    "currency_id": entry.currency_id,
+                    "converted_price": price,
+                }
+                for entry, price in zip(entries, converted)
+            ],
+        }
+
+    return await cached_json(request, db, MENU_TABLES, build)
+
+
+
+@router.get("/menu-entries")
+async def menu_entries_by_price(
+    request: Request,
+    currency: str,
+    descending: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    async def build():
+        rate = await models.CurrencyRate.get_by_code(db, currency)
+        if rate is None:
+            raise HTTPException(
+                status_code=400, detail=f"No rate for currency {currency}"
+            )
+        return [
+            {
+                "id": entry.id,
+                "menu_id": entry.menu_id,
+                "name": entry.name,
+                "price": entry.price,
+                "currency_id": entry.currency_id,
+                "converted_price": price,
+            }
+            for entry, price in await models.MenuEntry.get_all_by_price(
+                db, rate.currency_id, descending, skip, limit
+            )
+        ]
+
+    return await cached_json(request, db, MENU_TABLES, build)
+
+async def route_stops(db: AsyncSession, cafe_ids):
+    # Coordinates come from the shared location snapshot when there is
+    # one; cafes added since it was written are read from the database.
+    snapshot = get_location_snapshot()
+    stops, unknown = [], []
+    for cafe_id in cafe_ids:
+        coordinates = snapshot.coordinates(cafe_id) if snapshot else None
+        if coordinates is None:
+            unknown.append(cafe_id)
+        else:
+            stops.append((cafe_id, *coordinates))
+    if unknown:
+        stops += await models.Geodata.get_coordinates(db, unknown)
+    return stops
+
+
+@router.post("/routes")
+async def plan_route(
+    cafe_ids: list[str] = Body(..., embed=True),
+    start: str | None = Body(None, embed=True),
+    db: AsyncSession = Depends(get_db),
+):
+    cafe_ids = list(dict.fromkeys(cafe_ids))
+    if len(cafe_ids) > settings.ROUTE_MAX_STOPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ROUTE_MAX_STOPS} stops per route",
+        )
+    if start is not None and start not in cafe_ids:
+        raise HTTPException(
+            status_code=400, detail="start must be one of cafe_ids"
+        )
+    stops = await route_stops(db, cafe_ids)
+    missing = set(cafe_ids) - {cafe_id for cafe_id, _, _ in stops}
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No geodata for cafes: {', '.join(sorted(missing))}",
+        )
+    if start is None and cafe_ids:
+        start = cafe_ids[0]
+    route = await run_in_threadpool(route_planner.plan, stops, start)
+    return {"cafe_ids": route.stops, "distance_km": route.distance_km}
@@ -0,0 +1,114 @@
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import touch_tables
+from app.db import engine
+from app.geocoding import invalidate_reverse_geocoder
+from app.settings import settings
+from app.snapshot import refresh_existing_location_snapshot
+from db import bulk, models
+from db.summaries import refresh_company_summaries, refresh_summaries
+from db.table_versions import cascaded_tables
+
+OPERATIONS = {
+    ("delete", "companies"): bulk.delete_companies,
+    ("delete", "cafes"): bulk.delete_cafes,
+    ("delete", "menus"): bulk.delete_menus,
+    ("archive", "companies"): bulk.archive_companies,
+    ("archive", "cafes"): bulk.archive_cafes,
+    ("archive", "menus"): bulk.archive_menus,
+}
+
+
+def _affected_parents(table, identifiers):
+    # Deleting rows changes the summaries of their parents, which have to
+    # be looked up before the rows are gone.
+    if table == "menus":
+        parents, column, key = "cafes", models.Menu.cafe_id, models.Menu.id
+    elif table == "cafes":
+        parents, column, key = (
+            "companies",
+            models.Cafe.company_id,
+            models.Cafe.id,
+        )
+    else:
+        return None, set()
+
+    with engine.connect() as connection:
+        return parents, {
+            parent_id
+            for chunk in bulk.chunks(identifiers, 10_000)
+            for parent_id in connection.scalars(
+                select(column).where(key.in_(chunk))
+            )
+        }
+
+
+def _refresh_summaries(operation, table, identifiers, parents, parent_ids):
+    if operation == "archive":
+        # Archived rows are left out of the summaries, so the rows
+        # themselves are refreshed rather than their parents.
+        if table == "companies":
+            identifiers = bulk.cafe_ids_of_companies(engine, identifiers)
+            table = "cafes"
+        with engine.begin() as connection:
+            if table == "menus":
+                refresh_summaries(connection, menu_ids=identifiers)
+            else:
+                refresh_summaries(connection, cafe_ids=identifiers)
+        return
+
+    parent_ids.discard(None)
+    if parent_ids:
+        with engine.begin() as connection:
+            if parents == "cafes":
+                refresh_summaries(connection, cafe_ids=parent_ids)
+            else:
+                refresh_company_summaries(connection, parent_ids)
+
+
+def run_bulk(operation: str, table: str, identifiers, batch_size=None):
+    function = OPERATIONS[(operation, table)]
+    identifiers = list(identifiers)
+    parents, parent_ids = (None, set())
+    if operation == "delete":
+        parents, parent_ids = _affected_parents(table, identifiers)
+
+    try:
+        yield from function(
+            engine,
+            identifiers,
+            batch_size or settings.BULK_BATCH_SIZE,
+        )
+    finally:
+        _refresh_summaries(operation, table, identifiers, parents, parent_ids)
+        if table != "menus":
+            refresh_existing_location_snapshot()
+        # Geodata of deleted cafes went with them through ON DELETE
+        # CASCADE, so the reverse geocoder reloads on its next use.
+        if operation == "delete" and table != "menus":
+            invalidate_reverse_geocoder()
+        touch_tables(cascaded_tables({table}))
+
+
+def progress_lines(operation: str, table: str, identifiers):
+    for progress in run_bulk(operation, table, identifiers):
+        yield f"{progress.table}: {progress.done}/{progress.total}\n"
+    yield "done\n"
+
+
+def bulk_response(operation: str, table: str, request) -> StreamingResponse:
+    pks = request.query_params.get("pks", "")
+    return StreamingResponse(
+        progress_lines(operation, table, [pk for pk in pks.split(",") if pk]),
+        media_type="text/plain",
+    )
+
+
+async def bulk_delete_one(table: str, identifier: str):
+    def consume():
+        for _ in run_bulk("delete", table, [identifier]):
+            pass
+
+    await run_in_threadpool(consume)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import engine
+from app.settings import settings
+from db.table_versions import bump_table_versions, versions_query
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    tables: frozenset
+    expires_at: float
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, body: bytes, etag: str, tables) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag=etag,
+            tables=frozenset(tables),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *tables):
+        if not tables:
+            self._entries.clear()
+            return
+        tables = set(tables)
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if entry.tables & tables
+        ]:
+            del self._entries[key]
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in header.split(",")
+    )
+
+
+def touch_tables(tables):
+    # Moves the validators of every worker on, then drops the entries of
+    # this one right away.
+    tables = set(tables)
+    with engine.begin() as connection:
+        bump_table_versions(connection, tables)
+    response_cache.invalidate(*tables)
+
+
+async def table_versions(db: AsyncSession, tables) -> tuple:
+    # One primary key lookup, so the ETag can be checked without building
+    # the response or scanning the tables it is built from.
+    result = await db.execute(versions_query(tables))
+    return tuple(tuple(row) for row in result)
+
+
+async def cached_json(
+    request: Request, db: AsyncSession, tables, build
+) -> Response:
+    key = (request.url.path, request.url.query)
+    validator = await table_versions(db, tables)
+    etag = f'"{hashlib.sha1(repr((key, validator)).encode()).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={int(response_cache.ttl)}",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    entry = response_cache.get(key)
+    if entry is None or entry.etag != etag:
+        content = await build()
+        entry = response_cache.set(
+            key,
+            json.dumps(content, ensure_ascii=False, default=str).encode(),
+            etag,
+            tables,
+        )
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers=headers,
+    )
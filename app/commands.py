@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+
+from sqlalchemy import inspect
+
+from app.bulk import OPERATIONS, run_bulk
+from app.db import engine
+from app.dedup import find_geodata_duplicates
+from app.settings import settings
+from app.snapshot import refresh_location_snapshot
+from app.summaries import rebuild_all_summaries
+from db.main import Base
+from db.table_versions import create_table_versions
+
+
+def create_tables(args):
+    # Only creates tables, nullable columns and indexes that are missing,
+    # existing ones are left as is.
+    Base.metadata.create_all(engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table.name} "
+                    f"ADD COLUMN {column.name} {column_type}"
+                )
+                print(f"added {table.name}.{column.name}", file=sys.stderr)
+            indexes = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    print(f"added index {index.name}", file=sys.stderr)
+        if create_table_versions(connection):
+            print("added table versions", file=sys.stderr)
+    print("created missing tables", file=sys.stderr)
+
+
+def bulk(args):
+    for progress in run_bulk(
+        args.operation, args.table, args.ids, args.batch_size
+    ):
+        print(
+            f"{progress.table}: {progress.done}/{progress.total}",
+            file=sys.stderr,
+        )
+
+
+def dedup(args):
+    candidates = find_geodata_duplicates(args.ids)
+    for candidate in candidates:
+        print(json.dumps(candidate, ensure_ascii=False))
+    print(f"{len(candidates)} merge candidates", file=sys.stderr)
+
+
+def snapshot(args):
+    path = args.path or settings.LOCATION_SNAPSHOT_PATH
+    count = refresh_location_snapshot(path, args.double_precision)
+    print(f"wrote {count} locations to {path}", file=sys.stderr)
+
+
+def summaries(args):
+    rebuild_all_summaries()
+    print("rebuilt cafe and company summaries", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_tables_parser = subparsers.add_parser(
+        "create-tables",
+        help="create tables and columns added since the database was set up",
+    )
+    create_tables_parser.set_defaults(handler=create_tables)
+
+    for operation in sorted({operation for operation, _ in OPERATIONS}):
+        bulk_parser = subparsers.add_parser(
+            operation,
+            help=f"{operation} rows and everything that belongs to them",
+        )
+        bulk_parser.add_argument(
+            "table",
+            choices=sorted({table for _, table in OPERATIONS}),
+        )
+        bulk_parser.add_argument("ids", nargs="+")
+        bulk_parser.add_argument("--batch-size", type=int, default=None)
+        bulk_parser.set_defaults(handler=bulk, operation=operation)
+
+    dedup_parser = subparsers.add_parser(
+        "dedup",
+        help="print near-duplicate geodata pairs as JSON lines",
+    )
+    dedup_parser.add_argument(
+        "ids",
+        nargs="*",
+        help="only report pairs involving these geodata ids",
+    )
+    dedup_parser.set_defaults(handler=dedup)
+
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="regenerate the memory-mapped cafe location snapshot",
+    )
+    snapshot_parser.add_argument("--path", default=None)
+    snapshot_parser.add_argument(
+        "--float32",
+        dest="double_precision",
+        action="store_false",
+        default=None,
+        help="store coordinates as float32 instead of float64",
+    )
+    snapshot_parser.set_defaults(handler=snapshot)
+
+    summaries_parser = subparsers.add_parser(
+        "summaries",
+        help="rebuild the per-cafe and per-company menu/review summaries",
+    )
+    summaries_parser.set_defaults(handler=summaries)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.db import engine
+from app.settings import settings
+from db import models
+from db.table_versions import versions_query
+from pricing import CurrencyConverter
+
+RATE_TABLES = {"currencies", "currency_rates"}
+
+currency_converter = CurrencyConverter(ttl=settings.CURRENCY_RATES_TTL)
+_reload_lock = asyncio.Lock()
+
+
+def load_currency_converter():
+    stmt = select(
+        models.CurrencyRate.currency_id,
+        models.Currency.code,
+        models.CurrencyRate.rate,
+    ).join(
+        models.Currency,
+        models.CurrencyRate.currency_id == models.Currency.id,
+    )
+    with engine.connect() as connection:
+        # Versions are read first, so the rates are at least as new as the
+        # version they are stored under.
+        versions = connection.execute(versions_query(RATE_TABLES))
+        version = tuple(tuple(row) for row in versions)
+        currency_converter.load(connection.execute(stmt), version)
+    return currency_converter
+
+
+async def reload_currency_converter() -> CurrencyConverter:
+    return await run_in_threadpool(load_currency_converter)
+
+
+def _stale(version) -> bool:
+    return currency_converter.expired() or (
+        version is not None and version != currency_converter.version
+    )
+
+
+async def get_currency_converter(version=None) -> CurrencyConverter:
+    # Saves only reload the worker that handled them. Callers that know
+    # the current version of the rate tables get a converter loaded at it,
+    # for the others the TTL bounds how long old rates are served.
+    if _stale(version):
+        async with _reload_lock:
+            if _stale(version):
+                await reload_currency_converter()
+    return currency_converter
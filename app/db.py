@@ -2,10 +2,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import sessionmaker
 
-from app import settings
+from app.settings import settings
 
 engine = create_engine(
-    settings.POSTGRES_URL.replace("asyncpg", "psycopg2")
+    settings.POSTGRES_URL.replace("asyncpg", "psycopg2"),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
 )
 
 Base = automap_base()
@@ -20,3 +23,9 @@ Geodata = Base.classes.geodatas
 Menu = Base.classes.menus
 MenuEntry = Base.classes.menu_entries
 Currency = Base.classes.currencies
+
+
+def warm_up_pool():
+    connections = [engine.connect() for _ in range(settings.DB_POOL_SIZE)]
+    for connection in connections:
+        connection.close()
@@ -0,0 +1,86 @@
+import math
+
+from sqlalchemy import and_, or_, select
+
+from app.db import engine
+from app.settings import settings
+from db import models
+from db.bulk import chunks
+from geoutils import METERS_PER_DEGREE, find_duplicates
+
+
+def _surroundings(row):
+    lat, lon = float(row.latitude), float(row.longitude)
+    d_lat = settings.DEDUP_THRESHOLD_M * 1.01 / METERS_PER_DEGREE
+    d_lon = d_lat / math.cos(math.radians(min(abs(lat) + d_lat, 89.9)))
+    return and_(
+        models.Geodata.latitude.between(lat - d_lat, lat + d_lat),
+        models.Geodata.longitude.between(lon - d_lon, lon + d_lon),
+    )
+
+
+def find_geodata_duplicates(identifiers=None) -> list[dict]:
+    stmt = (
+        select(
+            models.Geodata.id,
+            models.Geodata.latitude,
+            models.Geodata.longitude,
+            models.Geodata.address,
+            models.Geodata.cafe_id,
+        )
+        .outerjoin(models.Cafe, models.Geodata.cafe_id == models.Cafe.id)
+        .filter(models.Cafe.archived_at.is_(None))
+    )
+    with engine.connect() as connection:
+        if identifiers:
+            # Only the selected rows and the rows around them are loaded,
+            # not the whole table.
+            rows = {
+                row.id: row
+                for chunk in chunks(identifiers, 1000)
+                for row in connection.execute(
+                    stmt.filter(models.Geodata.id.in_(chunk))
+                )
+            }
+            for chunk in chunks(list(rows.values()), 500):
+                rows.update(
+                    (row.id, row)
+                    for row in connection.execute(
+                        stmt.filter(or_(*map(_surroundings, chunk)))
+                    )
+                )
+        else:
+            rows = {row.id: row for row in connection.execute(stmt)}
+
+    candidates = find_duplicates(
+        (
+            (row.id, row.latitude, row.longitude, row.address)
+            for row in rows.values()
+        ),
+        threshold_meters=settings.DEDUP_THRESHOLD_M,
+        min_similarity=settings.DEDUP_MIN_SIMILARITY,
+    )
+    if identifiers:
+        identifiers = set(identifiers)
+        candidates = [
+            candidate
+            for candidate in candidates
+            if candidate.id_a in identifiers or candidate.id_b in identifiers
+        ]
+
+    return [
+        {
+            "geodata_ids": [candidate.id_a, candidate.id_b],
+            "cafe_ids": [
+                rows[candidate.id_a].cafe_id,
+                rows[candidate.id_b].cafe_id,
+            ],
+            "addresses": [
+                rows[candidate.id_a].address,
+                rows[candidate.id_b].address,
+            ],
+            "distance_m": round(candidate.distance_m, 2),
+            "similarity": round(candidate.similarity, 3),
+        }
+        for candidate in candidates
+    ]
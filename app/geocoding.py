@@ -0,0 +1,45 @@
+import asyncio
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.db import engine
+from app.settings import settings
+from db import models
+from geoutils import ReverseGeocoder
+
+reverse_geocoder = ReverseGeocoder(
+    tolerance_meters=settings.GEOCODER_TOLERANCE_M,
+    city_radius_km=settings.GEOCODER_CITY_RADIUS_KM,
+    country_radius_km=settings.GEOCODER_COUNTRY_RADIUS_KM,
+    ttl=settings.GEOCODER_RELOAD_TTL,
+)
+_reload_lock = asyncio.Lock()
+
+
+def load_reverse_geocoder():
+    stmt = select(
+        models.Geodata.id,
+        models.Geodata.latitude,
+        models.Geodata.longitude,
+        models.Geodata.address,
+        models.Geodata.city_id,
+        models.Geodata.country_id,
+    )
+    with engine.connect() as connection:
+        reverse_geocoder.load(connection.execute(stmt))
+    return reverse_geocoder
+
+
+def invalidate_reverse_geocoder():
+    reverse_geocoder.invalidate()
+
+
+async def get_reverse_geocoder() -> ReverseGeocoder:
+    # Admin saves only update the worker that handled them, and cascaded
+    # deletes none at all; the TTL bounds how long either goes unseen.
+    if reverse_geocoder.expired():
+        async with _reload_lock:
+            if reverse_geocoder.expired():
+                await run_in_threadpool(load_reverse_geocoder)
+    return reverse_geocoder
@@ -1,19 +1,49 @@
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from sqladmin import Admin, ModelView
-
-from app.db import SessionLocal, engine
+from sqladmin import Admin, ModelView, action
+from sqlalchemy.orm import noload
+from starlette.concurrency import run_in_threadpool
+
+from app.api import router as api_router
+from app.bulk import bulk_delete_one, bulk_response
+from app.cache import response_cache, touch_tables
+from app.currency import get_currency_converter, reload_currency_converter
+from app.db import SessionLocal, engine, warm_up_pool
+from app.dedup import find_geodata_duplicates
+from app.geocoding import get_reverse_geocoder, invalidate_reverse_geocoder
+from app.summaries import refresh_model_summaries, remember_summary_keys
 
 # from admin import db as models
-from app import settings
+from app.settings import settings
+from app.snapshot import (
+    close_location_snapshot,
+    refresh_existing_location_snapshot,
+)
 from db import models
+from db.main import sessionmanager
+from db.table_versions import cascaded_tables
 from geoutils import CoordinatesProcessor
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sessionmanager.init(settings.POSTGRES_URL)
+    await run_in_threadpool(warm_up_pool)
+    await get_reverse_geocoder()
+    await get_currency_converter()
+    yield
+    close_location_snapshot()
+    response_cache.invalidate()
+    await sessionmanager.close()
+    await run_in_threadpool(engine.dispose)
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,10 +53,61 @@ app.add_middleware(
 )
 
 
+app.include_router(api_router)
+
 admin = Admin(app, engine)
 
 
-class CompanyAdmin(ModelView, model=models.Company):
+class CachedModelView(ModelView):
+    async def after_model_change(self, data, model, is_created, request):
+        # Relationship fields of the form write to the tables they point
+        # to as well.
+        tables = {self.model.__tablename__} | {
+            relationship.target.name
+            for relationship in self.model.__mapper__.relationships
+        }
+        await run_in_threadpool(touch_tables, tables)
+
+    async def after_model_delete(self, model, request):
+        await run_in_threadpool(
+            touch_tables, cascaded_tables({self.model.__tablename__})
+        )
+
+
+class BulkModelView(CachedModelView):
+    # Deletes go through set-based DELETE statements and the database's
+    # ON DELETE CASCADE instead of loading every child row, so the
+    # on_model_delete and after_model_delete hooks are never called.
+    async def delete_model(self, request, pk):
+        await bulk_delete_one(self.model.__tablename__, pk)
+
+    async def get_object_for_delete(self, value):
+        # Only checks that the row exists, relationships such as
+        # Company.cafes are not needed for that.
+        stmt = self._stmt_by_identifier(value).options(noload("*"))
+        return await self._get_object_by_pk(stmt)
+
+    @action(
+        name="bulk_delete",
+        label="Delete with cascade",
+        confirmation_message="Delete the selected rows and everything "
+        "that belongs to them?",
+        add_in_detail=False,
+    )
+    async def bulk_delete(self, request):
+        return bulk_response("delete", self.model.__tablename__, request)
+
+    @action(
+        name="archive",
+        label="Archive",
+        confirmation_message="Archive the selected rows and everything "
+        "that belongs to them?",
+    )
+    async def archive(self, request):
+        return bulk_response("archive", self.model.__tablename__, request)
+
+
+class CompanyAdmin(BulkModelView, model=models.Company):
     name_plural = "Companies"
     column_list = [
         key
@@ -34,13 +115,15 @@ class CompanyAdmin(ModelView, model=models.Company):
         if not any(
             [
                 key.startswith("_"),
-                key in ["id", "created_at", "logo"],
+                key in ["id", "created_at", "updated_at", "logo"],
             ]
         )
     ]
     form_excluded_columns = [
         models.Company.id,
         models.Company.created_at,
+        models.Company.updated_at,
+        models.Company.archived_at,
     ]
 
     async def on_model_change(self, data, model, is_created, request):
@@ -49,7 +132,7 @@ class CompanyAdmin(ModelView, model=models.Company):
             data["created_at"] = datetime.now()
 
 
-class CafeAdmin(ModelView, model=models.Cafe):
+class CafeAdmin(BulkModelView, model=models.Cafe):
     name_plural = "Cafes"
     column_list = [
         key
@@ -58,13 +141,15 @@ class CafeAdmin(ModelView, model=models.Cafe):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at"],
+                key in ["created_at", "updated_at"],
             ]
         )
     ]
     form_excluded_columns = [
         models.Cafe.id,
         models.Cafe.created_at,
+        models.Cafe.updated_at,
+        models.Cafe.archived_at,
     ]
 
     async def on_model_change(self, data, model, is_created, request):
@@ -72,8 +157,13 @@ class CafeAdmin(ModelView, model=models.Cafe):
             data["id"] = str(uuid.uuid4())
             data["created_at"] = datetime.now()
 
+    async def after_model_change(self, data, model, is_created, request):
+        await super().after_model_change(data, model, is_created, request)
+        # The form can move a cafe to another geodata row.
+        await run_in_threadpool(refresh_existing_location_snapshot)
+
 
-class GeodataAdmin(ModelView, model=models.Geodata):
+class GeodataAdmin(CachedModelView, model=models.Geodata):
     name_plural = "Geodata"
     column_list = [
         key
@@ -85,9 +175,11 @@ class GeodataAdmin(ModelView, model=models.Geodata):
                 in [
                     "id",
                     "created_at",
+                    "updated_at",
                     "latitude",
                     "longitude",
                     "get_all",
+                    "get_coordinates",
                 ],
                 key.endswith("_id"),
             ]
@@ -97,6 +189,7 @@ class GeodataAdmin(ModelView, model=models.Geodata):
     form_excluded_columns = [
         models.Geodata.id,
         models.Geodata.created_at,
+        models.Geodata.updated_at,
         models.Geodata.latitude,
         models.Geodata.longitude,
     ]
@@ -108,19 +201,68 @@ class GeodataAdmin(ModelView, model=models.Geodata):
             )
         )
         print(data["latitude"], data["longitude"])
-        data["address"] = (
-            await CoordinatesProcessor.coordinates_to_address(
-                data["latitude"],
-                data["longitude"],
-            )
+        reverse_geocoder = await get_reverse_geocoder()
+        # An edited row must not resolve to its own, possibly wrong,
+        # stored address.
+        geocoded = await reverse_geocoder.coordinates_to_address(
+            data["latitude"],
+            data["longitude"],
+            exclude=None if is_created else model.id,
         )
+        data["address"] = geocoded.address
         print(data["address"])
+        if not data.get("city") and geocoded.city_id is not None:
+            data.pop("city", None)
+            data["city_id"] = geocoded.city_id
+        if not data.get("country") and geocoded.country_id is not None:
+            data.pop("country", None)
+            data["country_id"] = geocoded.country_id
         if is_created:
             data["id"] = str(uuid.uuid4())
             data["created_at"] = datetime.now()
+        request.state.cafe_id = None if is_created else model.cafe_id
+
+    async def after_model_change(self, data, model, is_created, request):
+        await super().after_model_change(data, model, is_created, request)
+        reverse_geocoder = await get_reverse_geocoder()
+        reverse_geocoder.add(
+            model.id,
+            model.latitude,
+            model.longitude,
+            model.address,
+            model.city_id,
+            model.country_id,
+        )
+        # Only geodata of cafes is in the location snapshot.
+        if model.cafe_id or request.state.cafe_id:
+            await run_in_threadpool(refresh_existing_location_snapshot)
+
+    async def on_model_delete(self, model, request):
+        request.state.geodata_id = model.id
+        request.state.cafe_id = model.cafe_id
+
+    async def after_model_delete(self, model, request):
+        await super().after_model_delete(model, request)
+        reverse_geocoder = await get_reverse_geocoder()
+        reverse_geocoder.remove(request.state.geodata_id)
+        if request.state.cafe_id:
+            await run_in_threadpool(refresh_existing_location_snapshot)
+
+    @action(
+        name="find_duplicates",
+        label="Find duplicates",
+        add_in_detail=False,
+    )
+    async def find_duplicates(self, request):
+        pks = request.query_params.get("pks", "")
+        candidates = await run_in_threadpool(
+            find_geodata_duplicates,
+            [pk for pk in pks.split(",") if pk],
+        )
+        return JSONResponse(status_code=200, content=candidates)
 
 
-class ReviewAdmin(ModelView, model=models.Review):
+class ReviewAdmin(CachedModelView, model=models.Review):
     name_plural = "Reviews"
     column_list = [
         key
@@ -129,7 +271,7 @@ class ReviewAdmin(ModelView, model=models.Review):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at"],
+                key in ["created_at", "updated_at"],
             ]
         )
     ]
@@ -137,15 +279,29 @@ class ReviewAdmin(ModelView, model=models.Review):
     form_excluded_columns = [
         models.Review.id,
         models.Review.created_at,
+        models.Review.updated_at,
     ]
 
     async def on_model_change(self, data, model, is_created, request):
         if is_created:
             data["id"] = str(uuid.uuid4())
             data["created_at"] = datetime.now()
+        else:
+            remember_summary_keys(model, request)
+
+    async def after_model_change(self, data, model, is_created, request):
+        await refresh_model_summaries(model, request)
+        await super().after_model_change(data, model, is_created, request)
 
+    async def on_model_delete(self, model, request):
+        remember_summary_keys(model, request)
 
-class MenuAdmin(ModelView, model=models.Menu):
+    async def after_model_delete(self, model, request):
+        await refresh_model_summaries(model, request, deleted=True)
+        await super().after_model_delete(model, request)
+
+
+class MenuAdmin(BulkModelView, model=models.Menu):
     name_plural = "Menus"
     column_list = [
         key
@@ -154,7 +310,7 @@ class MenuAdmin(ModelView, model=models.Menu):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at"],
+                key in ["created_at", "updated_at", "get_by_cafe"],
             ]
         )
     ]
@@ -162,15 +318,23 @@ class MenuAdmin(ModelView, model=models.Menu):
     form_excluded_columns = [
         models.Menu.id,
         models.Menu.created_at,
+        models.Menu.updated_at,
+        models.Menu.archived_at,
     ]
 
     async def on_model_change(self, data, model, is_created, request):
         if is_created:
             data["id"] = str(uuid.uuid4())
             data["created_at"] = datetime.now()
+        else:
+            remember_summary_keys(model, request)
+
+    async def after_model_change(self, data, model, is_created, request):
+        await refresh_model_summaries(model, request)
+        await super().after_model_change(data, model, is_created, request)
 
 
-class MenuEntryAdmin(ModelView, model=models.MenuEntry):
+class MenuEntryAdmin(CachedModelView, model=models.MenuEntry):
     name_plural = "Menus' entries"
     column_list = [
         key
@@ -179,7 +343,7 @@ class MenuEntryAdmin(ModelView, model=models.MenuEntry):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at"],
+                key in ["created_at", "updated_at", "get_all_by_price"],
             ]
         )
     ]
@@ -187,15 +351,29 @@ class MenuEntryAdmin(ModelView, model=models.MenuEntry):
     form_excluded_columns = [
         models.MenuEntry.id,
         models.MenuEntry.created_at,
+        models.MenuEntry.updated_at,
     ]
 
     async def on_model_change(self, data, model, is_created, request):
         if is_created:
             data["id"] = str(uuid.uuid4())
             data["created_at"] = datetime.now()
+        else:
+            remember_summary_keys(model, request)
+
+    async def after_model_change(self, data, model, is_created, request):
+        await refresh_model_summaries(model, request)
+        await super().after_model_change(data, model, is_created, request)
+
+    async def on_model_delete(self, model, request):
+        remember_summary_keys(model, request)
 
+    async def after_model_delete(self, model, request):
+        await refresh_model_summaries(model, request, deleted=True)
+        await super().after_model_delete(model, request)
 
-class CountryAdmin(ModelView, model=models.Country):
+
+class CountryAdmin(CachedModelView, model=models.Country):
     name_plural = "Countries"
     column_list = [
         key
@@ -214,8 +392,13 @@ class CountryAdmin(ModelView, model=models.Country):
         if is_created:
             data["created_at"] = datetime.now()
 
+    async def after_model_delete(self, model, request):
+        await super().after_model_delete(model, request)
+        # Its geodata and centroid go too, so the index is rebuilt.
+        invalidate_reverse_geocoder()
+
 
-class CityAdmin(ModelView, model=models.City):
+class CityAdmin(CachedModelView, model=models.City):
     name_plural = "Cities"
     column_list = [
         key
@@ -224,19 +407,27 @@ class CityAdmin(ModelView, model=models.City):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at", "geodata"],
+                key in ["created_at", "updated_at", "geodata"],
             ]
         )
     ]
     form_include_pk = True
-    form_excluded_columns = [models.City.country_id]
+    form_excluded_columns = [
+        models.City.country_id,
+        models.City.updated_at,
+    ]
 
     async def on_model_change(self, data, model, is_created, request):
         if is_created:
             data["created_at"] = datetime.now()
 
+    async def after_model_delete(self, model, request):
+        await super().after_model_delete(model, request)
+        # Its geodata and centroid go too, so the index is rebuilt.
+        invalidate_reverse_geocoder()
 
-class CurrencyAdmin(ModelView, model=models.Currency):
+
+class CurrencyAdmin(CachedModelView, model=models.Currency):
     name_plural = "Currencies"
     column_list = [
         key
@@ -245,17 +436,39 @@ class CurrencyAdmin(ModelView, model=models.Currency):
             [
                 key.startswith("_"),
                 key.endswith("id"),
-                key in ["created_at", "entries"],
+                key in ["created_at", "updated_at", "entries"],
             ]
         )
     ]
     form_include_pk = True
+    form_excluded_columns = [models.Currency.updated_at]
 
     async def on_model_change(self, data, model, is_created, request):
         if is_created:
             data["created_at"] = datetime.now()
 
 
+class CurrencyRateAdmin(CachedModelView, model=models.CurrencyRate):
+    name_plural = "Currency rates"
+    column_list = [
+        models.CurrencyRate.currency,
+        models.CurrencyRate.rate,
+        models.CurrencyRate.updated_at,
+    ]
+    form_excluded_columns = [models.CurrencyRate.updated_at]
+
+    async def on_model_change(self, data, model, is_created, request):
+        data["updated_at"] = datetime.now()
+
+    async def after_model_change(self, data, model, is_created, request):
+        await reload_currency_converter()
+        await super().after_model_change(data, model, is_created, request)
+
+    async def after_model_delete(self, model, request):
+        await reload_currency_converter()
+        await super().after_model_delete(model, request)
+
+
 admin.add_view(CompanyAdmin)
 admin.add_view(CafeAdmin)
 admin.add_view(GeodataAdmin)
@@ -265,6 +478,7 @@ admin.add_view(MenuEntryAdmin)
 admin.add_view(CountryAdmin)
 admin.add_view(CityAdmin)
 admin.add_view(CurrencyAdmin)
+admin.add_view(CurrencyRateAdmin)
 
 
 @app.get("/healthz")
@@ -276,10 +490,16 @@ if __name__ == "__main__":
     import uvicorn
 
     uvicorn.run(
-        "admin.main:app",
-        host="0.0.0.0",
-        port=9094,
-        reload=settings.DEBUG,
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WORKERS,
+        reload=settings.RELOAD,
+        loop=settings.LOOP,
+        http=settings.HTTP,
+        backlog=settings.BACKLOG,
+        timeout_keep_alive=settings.KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
         log_level="info",
         use_colors=True,
     )
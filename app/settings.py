@@ -7,6 +7,41 @@ load_dotenv()
 class Settings(BaseSettings):
     POSTGRES_URL: str
     DEBUG: bool = False
+
+    HOST: str = "0.0.0.0"
+    PORT: int = 9094
+    WORKERS: int = 1
+    RELOAD: bool = False
+    # "auto" picks uvloop/httptools when they are installed.
+    LOOP: str = "auto"
+    HTTP: str = "auto"
+    BACKLOG: int = 2048
+    KEEPALIVE_TIMEOUT: int = 5
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    GEOCODER_TOLERANCE_M: float = 25.0
+    GEOCODER_CITY_RADIUS_KM: float = 50.0
+    GEOCODER_COUNTRY_RADIUS_KM: float = 1000.0
+    GEOCODER_RELOAD_TTL: float = 300.0
+
+    DEDUP_THRESHOLD_M: float = 30.0
+    DEDUP_MIN_SIMILARITY: float = 0.6
+
+    CURRENCY_RATES_TTL: float = 60.0
+
+    BULK_BATCH_SIZE: int = 1000
+
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_TTL: float = 30.0
+
+    ROUTE_MAX_STOPS: int = 500
+
+    LOCATION_SNAPSHOT_PATH: str = "locations.snapshot"
+    LOCATION_SNAPSHOT_DOUBLE_PRECISION: bool = True
+
     class Config:
         env_file = ".env"
 
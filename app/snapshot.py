@@ -0,0 +1,76 @@
+import os
+
+from sqlalchemy import select
+
+from app.db import engine
+from app.settings import settings
+from db import models
+from geoutils import LocationSnapshot
+
+_snapshot: LocationSnapshot | None = None
+_snapshot_stat = None
+
+
+def refresh_location_snapshot(
+    path: str | None = None, double_precision: bool | None = None
+) -> int:
+    if double_precision is None:
+        double_precision = settings.LOCATION_SNAPSHOT_DOUBLE_PRECISION
+    stmt = (
+        select(
+            models.Geodata.cafe_id,
+            models.Geodata.latitude,
+            models.Geodata.longitude,
+            models.City.code,
+            models.Country.code,
+        )
+        .join(models.Cafe, models.Geodata.cafe_id == models.Cafe.id)
+        .outerjoin(models.City, models.Geodata.city_id == models.City.id)
+        .outerjoin(
+            models.Country, models.Geodata.country_id == models.Country.id
+        )
+        .filter(models.Cafe.archived_at.is_(None))
+        .order_by(models.Geodata.cafe_id)
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(stmt).all()
+    return LocationSnapshot.write(
+        path or settings.LOCATION_SNAPSHOT_PATH,
+        rows,
+        double_precision=double_precision,
+    )
+
+
+def refresh_existing_location_snapshot():
+    # Routes prefer the snapshot over the database, so once there is one
+    # every change to cafe coordinates has to be written to it.
+    if os.path.exists(settings.LOCATION_SNAPSHOT_PATH):
+        refresh_location_snapshot()
+
+
+def get_location_snapshot() -> LocationSnapshot | None:
+    # The snapshot is rewritten by rename, so a new inode or mtime means
+    # another process refreshed it and this worker should remap it.
+    global _snapshot, _snapshot_stat
+    try:
+        stat = os.stat(settings.LOCATION_SNAPSHOT_PATH)
+    except FileNotFoundError:
+        close_location_snapshot()
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns)
+    if _snapshot is None or key != _snapshot_stat:
+        close_location_snapshot()
+        try:
+            _snapshot = LocationSnapshot.load(settings.LOCATION_SNAPSHOT_PATH)
+        except ValueError:
+            return None
+        _snapshot_stat = key
+    return _snapshot
+
+
+def close_location_snapshot():
+    global _snapshot, _snapshot_stat
+    if _snapshot is not None:
+        _snapshot.close()
+        _snapshot = None
+    _snapshot_stat = None
@@ -0,0 +1,45 @@
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import response_cache
+from app.db import engine
+from db import models
+from db.summaries import (
+    SUMMARY_TABLES,
+    rebuild_summaries,
+    refresh_summaries,
+)
+
+def _summary_keys(model):
+    if isinstance(model, models.MenuEntry):
+        return {model.menu_id}, set()
+    return set(), {model.cafe_id}
+
+
+def remember_summary_keys(model, request):
+    request.state.summary_keys = _summary_keys(model)
+
+
+def _refresh(menu_ids, cafe_ids):
+    with engine.begin() as connection:
+        refresh_summaries(connection, cafe_ids=cafe_ids, menu_ids=menu_ids)
+
+
+async def refresh_model_summaries(model, request, deleted=False):
+    menu_ids, cafe_ids = getattr(
+        request.state, "summary_keys", (set(), set())
+    )
+    if not deleted:
+        current_menu_ids, current_cafe_ids = _summary_keys(model)
+        menu_ids, cafe_ids = (
+            menu_ids | current_menu_ids,
+            cafe_ids | current_cafe_ids,
+        )
+    await run_in_threadpool(_refresh, menu_ids, cafe_ids)
+    response_cache.invalidate(
+        *(table.name for table in SUMMARY_TABLES)
+    )
+
+
+def rebuild_all_summaries():
+    with engine.begin() as connection:
+        rebuild_summaries(connection)
@@ -0,0 +1,305 @@
+"""Load test for the admin app at rising concurrency levels.
+
+    python -m benchmarks.loadtest --levels 1,4,16,64 --duration 10
+    python -m benchmarks.loadtest --url http://127.0.0.1:9094
+
+Without --url the app is driven in-process (POSTGRES_URL must point at a
+database with the tables created) and the ArcGIS calls are replaced by a
+mock with --geocoder-latency-ms of delay. Geodata rows created by the run
+are the only ones it edits, and they are deleted when it finishes.
+
+With --url an already running server is used; it only gets read
+requests, since the rows it would create cannot be cleaned up, and
+geocoder mocking and pool sampling are unavailable.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+import httpx
+
+MIX = {
+    "list": 60,
+    "healthz": 20,
+    "geodata_create": 10,
+    "geodata_edit": 10,
+}
+READ_MIX = {kind: MIX[kind] for kind in ("list", "healthz")}
+
+
+def percentile(values, fraction: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client,
+        identities,
+        pool=None,
+        geodata_ids=None,
+        mix=MIX,
+        seed: int = 0,
+    ):
+        self.client = client
+        self.identities = identities
+        self.pool = pool
+        # Ids of the rows this run created; only those are edited.
+        self.geodata_ids = [] if geodata_ids is None else geodata_ids
+        self.mix = mix
+        self.random = random.Random(seed)
+
+    async def list_page(self):
+        identity = self.random.choice(self.identities)
+        return await self.client.get(f"/admin/{identity}/list")
+
+    async def healthz(self):
+        return await self.client.get("/healthz")
+
+    def _geodata_form(self):
+        return {
+            "address": f"Tverskaya {self.random.randint(1, 200)}, Moscow",
+        }
+
+    async def geodata_create(self):
+        return await self.client.post(
+            "/admin/geodata/create", data=self._geodata_form()
+        )
+
+    async def geodata_edit(self):
+        if not self.geodata_ids:
+            return await self.geodata_create()
+        pk = self.random.choice(self.geodata_ids)
+        return await self.client.post(
+            f"/admin/geodata/edit/{pk}", data=self._geodata_form()
+        )
+
+    async def worker(self, deadline: float, samples):
+        kinds, weights = zip(*self.mix.items())
+        while time.perf_counter() < deadline:
+            kind = self.random.choices(kinds, weights)[0]
+            request = {
+                "list": self.list_page,
+                "healthz": self.healthz,
+                "geodata_create": self.geodata_create,
+                "geodata_edit": self.geodata_edit,
+            }[kind]
+            started = time.perf_counter()
+            try:
+                response = await request()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples[kind].append((time.perf_counter() - started, ok))
+
+    async def sample_pool(self, saturation, stop: asyncio.Event):
+        capacity = self.pool.size() + self.pool._max_overflow
+        while not stop.is_set():
+            saturation.append(self.pool.checkedout() / capacity)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), 0.05)
+
+    async def run_level(self, concurrency: int, duration: float) -> dict:
+        samples = defaultdict(list)
+        saturation = []
+        stop = asyncio.Event()
+        sampler = (
+            asyncio.create_task(self.sample_pool(saturation, stop))
+            if self.pool is not None
+            else None
+        )
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(self.worker(deadline, samples) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        if sampler is not None:
+            await sampler
+
+        latencies = [
+            latency for kind in samples.values() for latency, _ in kind
+        ]
+        errors = sum(not ok for kind in samples.values() for _, ok in kind)
+        return {
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": len(latencies) / elapsed,
+            "p50_ms": _ms(percentile(latencies, 0.50)),
+            "p95_ms": _ms(percentile(latencies, 0.95)),
+            "p99_ms": _ms(percentile(latencies, 0.99)),
+            "pool_saturation_mean": (
+                statistics.mean(saturation) if saturation else None
+            ),
+            "pool_saturation_max": max(saturation) if saturation else None,
+            "by_kind": {
+                kind: {
+                    "requests": len(values),
+                    "errors": sum(not ok for _, ok in values),
+                    "p50_ms": _ms(percentile([v for v, _ in values], 0.50)),
+                    "p95_ms": _ms(percentile([v for v, _ in values], 0.95)),
+                }
+                for kind, values in samples.items()
+            },
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def mock_geocoder(latency: float):
+    from geoutils import CoordinatesProcessor
+
+    rng = random.Random(1)
+
+    async def address_to_coordinates(address: str):
+        await asyncio.sleep(latency)
+        return [
+            round(55.5 + rng.random(), 4),
+            round(37.3 + rng.random(), 4),
+        ]
+
+    async def coordinates_to_address(lat: float, lon: float):
+        await asyncio.sleep(latency)
+        return f"Mock street {uuid4().hex[:8]}"
+
+    CoordinatesProcessor.address_to_coordinates = address_to_coordinates
+    CoordinatesProcessor.coordinates_to_address = coordinates_to_address
+
+
+def record_created_geodata(geodata_admin, created):
+    original = geodata_admin.after_model_change
+
+    async def after_model_change(self, data, model, is_created, request):
+        await original(self, data, model, is_created, request)
+        if is_created:
+            created.append(model.id)
+
+    geodata_admin.after_model_change = after_model_change
+
+
+def delete_geodata(engine, identifiers):
+    from sqlalchemy import delete
+
+    from db import models
+    from db.bulk import chunks
+    from db.table_versions import bump_table_versions
+
+    with engine.begin() as connection:
+        for chunk in chunks(identifiers, 1000):
+            connection.execute(
+                delete(models.Geodata).where(models.Geodata.id.in_(chunk))
+            )
+        bump_table_versions(connection, {models.Geodata.__tablename__})
+
+
+@contextlib.asynccontextmanager
+async def in_process_client(geocoder_latency: float):
+    mock_geocoder(geocoder_latency)
+
+    from app.main import GeodataAdmin, admin, app, engine
+
+    created = []
+    record_created_geodata(GeodataAdmin, created)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(
+            app=app, raise_app_exceptions=False
+        )
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://loadtest"
+            ) as client:
+                identities = [view.identity for view in admin.views]
+                yield client, identities, engine.pool, created
+        finally:
+            delete_geodata(engine, created)
+            print(f"deleted {len(created)} geodata rows created by the run")
+
+
+@contextlib.asynccontextmanager
+async def remote_client(url: str, identities):
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        yield client, identities, None, None
+
+
+def print_header():
+    print(
+        f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'errors':>7} {'pool':>6}"
+    )
+
+
+def print_level(level):
+    pool = level["pool_saturation_max"]
+    print(
+        f"{level['concurrency']:>5} {level['throughput_rps']:>9.1f} "
+        f"{level['p50_ms']:>9} {level['p95_ms']:>9} "
+        f"{level['p99_ms']:>9} {level['errors']:>7} "
+        f"{'-' if pool is None else f'{pool:.0%}':>6}"
+    )
+
+
+async def run(args):
+    if args.url:
+        client_context = remote_client(args.url, args.identities)
+    else:
+        client_context = in_process_client(args.geocoder_latency_ms / 1000)
+
+    levels = []
+    async with client_context as (client, identities, pool, created):
+        load_test = LoadTest(
+            client,
+            args.identities or identities,
+            pool,
+            geodata_ids=created,
+            mix=READ_MIX if args.url else MIX,
+        )
+        print_header()
+        for concurrency in args.levels:
+            level = await load_test.run_level(concurrency, args.duration)
+            print_level(level)
+            levels.append(level)
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--url", default=None)
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 2, 4, 8, 16, 32],
+    )
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--geocoder-latency-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--identities",
+        type=lambda value: value.split(","),
+        default=None,
+        help="admin views to list, e.g. cafe,geodata (default: all)",
+    )
+    parser.add_argument("--output", default=None, help="write JSON here")
+    args = parser.parse_args(argv)
+    if args.url and not args.identities:
+        parser.error("--identities is required together with --url")
+
+    levels = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"levels": levels}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Benchmarks for the geoutils and model query hot paths.
+
+    python -m benchmarks.run --size 2000 --output bench.json
+    python -m benchmarks.run --compare bench.json
+
+The database benchmarks run against a throwaway SQLite file through
+aiosqlite by default; pass --database-url to use a local Postgres
+(postgresql+asyncpg://...) instead. Its tables are dropped and recreated.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+os.environ.setdefault("POSTGRES_URL", "sqlite://")
+
+from sqlalchemy import insert  # noqa: E402
+
+from db import models  # noqa: E402
+from db.main import DatabaseSessionManager  # noqa: E402
+from geoutils import CoordinatesProcessor, RoutePlanner  # noqa: E402
+from geoutils.coordinates_processor import haversine  # noqa: E402
+
+
+async def measure(function, repeat: int, operations: int = 1) -> dict:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await function()
+        runs.append(time.perf_counter() - started)
+    median = statistics.median(runs)
+    return {
+        "median_s": median,
+        "min_s": min(runs),
+        "max_s": max(runs),
+        "operations": operations,
+        "operations_per_s": operations / median if median else None,
+    }
+
+
+def random_points(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        (55.5 + rng.random(), 37.3 + rng.random()) for _ in range(count)
+    ]
+
+
+async def bench_distance(args) -> dict:
+    points = random_points(args.points)
+    pairs = list(zip(points, points[1:] + points[:1]))
+
+    async def coordinates_to_distance():
+        for (lat_a, lon_a), (lat_b, lon_b) in pairs:
+            await CoordinatesProcessor.coordinates_to_distance(
+                lat_a, lon_a, lat_b, lon_b
+            )
+
+    async def plain_haversine():
+        for (lat_a, lon_a), (lat_b, lon_b) in pairs:
+            haversine(lat_a, lon_a, lat_b, lon_b)
+
+    stops = [
+        (f"cafe-{i}", lat, lon)
+        for i, (lat, lon) in enumerate(points[: args.route_stops])
+    ]
+
+    async def route_plan():
+        # A fresh planner each run so the matrix cache does not hide the
+        # cost of building it.
+        RoutePlanner().plan(stops)
+
+    return {
+        "coordinates_to_distance": await measure(
+            coordinates_to_distance, args.repeat, len(pairs)
+        ),
+        "haversine": await measure(plain_haversine, args.repeat, len(pairs)),
+        "route_plan": await measure(route_plan, args.repeat, len(stops)),
+    }
+
+
+async def seed(sessionmanager: DatabaseSessionManager, size: int):
+    rng = random.Random(1)
+    countries = [
+        {"id": i, "code": f"C{i}", "name": f"Country {i}", "name_ru": f"C{i}"}
+        for i in range(1, 4)
+    ]
+    cities = [
+        {
+            "id": i,
+            "code": f"T{i}",
+            "name": f"City {i}",
+            "name_ru": f"T{i}",
+            "country_id": (i - 1) % len(countries) + 1,
+        }
+        for i in range(1, 10)
+    ]
+    currencies = [{"id": 1, "code": "RUB", "name": "Ruble", "name_ru": "R"}]
+    companies, cafes, geodatas = [], [], []
+    menus, entries, reviews = [], [], []
+    now = datetime.now()
+    for i in range(max(size // 10, 1)):
+        companies.append(
+            {"id": str(uuid4()), "name": f"Co {i}", "name_ru": f"Co {i}"}
+        )
+    for i in range(size):
+        city = cities[i % len(cities)]
+        cafe_id = str(uuid4())
+        menu_id = str(uuid4())
+        cafes.append(
+            {
+                "id": cafe_id,
+                "company_id": companies[i % len(companies)]["id"],
+                "created_at": now,
+            }
+        )
+        geodatas.append(
+            {
+                "id": str(uuid4()),
+                "cafe_id": cafe_id,
+                "latitude": round(55.5 + rng.random(), 4),
+                "longitude": round(37.3 + rng.random(), 4),
+                "address": f"Street {i}, {city['name']}",
+                "city_id": city["id"],
+                "country_id": city["country_id"],
+                "created_at": now,
+            }
+        )
+        menus.append({"id": menu_id, "cafe_id": cafe_id, "created_at": now})
+        for j in range(5):
+            entries.append(
+                {
+                    "id": str(uuid4()),
+                    "menu_id": menu_id,
+                    "name": f"Item {j}",
+                    "price": rng.randint(100, 500),
+                    "currency_id": 1,
+                    "created_at": now,
+                }
+            )
+        reviews.append(
+            {
+                "id": str(uuid4()),
+                "cafe_id": cafe_id,
+                "rating": rng.randint(1, 5),
+                "title": "Review",
+                "created_at": now,
+            }
+        )
+
+    async with sessionmanager.connect() as connection:
+        await sessionmanager.drop_all(connection)
+        await sessionmanager.create_all(connection)
+        for model, rows in [
+            (models.Country, countries),
+            (models.City, cities),
+            (models.Currency, currencies),
+            (models.Company, companies),
+            (models.Cafe, cafes),
+            (models.Geodata, geodatas),
+            (models.Menu, menus),
+            (models.MenuEntry, entries),
+            (models.Review, reviews),
+        ]:
+            await connection.execute(insert(model), rows)
+
+
+async def bench_models(args, sessionmanager: DatabaseSessionManager) -> dict:
+    results = {}
+    await seed(sessionmanager, args.size)
+    creates = args.creates
+
+    async def create_one_by_one():
+        async with sessionmanager.session() as db:
+            for _ in range(creates):
+                await models.Company.create(
+                    db, name=f"bench {uuid4()}", name_ru=f"bench {uuid4()}"
+                )
+
+    async def create_add_all():
+        async with sessionmanager.session() as db:
+            db.add_all(
+                models.Company(
+                    id=str(uuid4()),
+                    name=f"bench {uuid4()}",
+                    name_ru=f"bench {uuid4()}",
+                )
+                for _ in range(creates)
+            )
+            await db.commit()
+
+    async def create_executemany():
+        async with sessionmanager.session() as db:
+            await db.execute(
+                insert(models.Company),
+                [
+                    {
+                        "id": str(uuid4()),
+                        "name": f"bench {uuid4()}",
+                        "name_ru": f"bench {uuid4()}",
+                    }
+                    for _ in range(creates)
+                ],
+            )
+            await db.commit()
+
+    results["base_model_create"] = await measure(
+        create_one_by_one, args.repeat, creates
+    )
+    results["bulk_add_all"] = await measure(
+        create_add_all, args.repeat, creates
+    )
+    results["bulk_insert"] = await measure(
+        create_executemany, args.repeat, creates
+    )
+
+    async def geodata_get_all():
+        async with sessionmanager.session() as db:
+            await models.Geodata.get_all(db, country=1, city=1, limit=100)
+
+    async def city_get_cafes():
+        async with sessionmanager.session() as db:
+            await models.City.get_cafes(db, city="City 1")
+
+    results["geodata_get_all"] = await measure(geodata_get_all, args.repeat)
+    results["city_get_cafes"] = await measure(city_get_cafes, args.repeat)
+    return results
+
+
+class MockGeocoderHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.path.startswith("/find"):
+            body = {
+                "locations": [
+                    {"feature": {"geometry": {"x": 37.6173, "y": 55.7558}}}
+                ]
+            }
+        else:
+            body = {"address": {"Address": "Tverskaya 1", "LongLabel": ""}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def mock_geocoder(latency: float):
+    handler = type(
+        "Handler", (MockGeocoderHandler,), {"latency": latency}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = CoordinatesProcessor.base_url
+    CoordinatesProcessor.base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        yield
+    finally:
+        CoordinatesProcessor.base_url = base_url
+        server.shutdown()
+        server.server_close()
+
+
+async def bench_geocoder(args) -> dict:
+    calls = args.geocoder_calls
+
+    async def sequential():
+        for _ in range(calls):
+            await CoordinatesProcessor.address_to_coordinates("Tverskaya 1")
+            await CoordinatesProcessor.coordinates_to_address(
+                55.7558, 37.6173
+            )
+
+    async def concurrent():
+        await asyncio.gather(
+            *(
+                CoordinatesProcessor.address_to_coordinates("Tverskaya 1")
+                for _ in range(calls)
+            )
+        )
+
+    with mock_geocoder(args.latency_ms / 1000):
+        # coordinates_to_address prints every response.
+        with contextlib.redirect_stdout(io.StringIO()):
+            return {
+                "geocoder_sequential": await measure(
+                    sequential, args.repeat, calls * 2
+                ),
+                "geocoder_concurrent": await measure(
+                    concurrent, args.repeat, calls
+                ),
+            }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict):
+    print(f"{'benchmark':32} {'before':>10} {'after':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        after = result["median_s"]
+        if before is None:
+            print(f"{name:32} {'-':>10} {after:10.4f}")
+            continue
+        change = (after / before["median_s"] - 1) * 100
+        print(
+            f"{name:32} {before['median_s']:10.4f} {after:10.4f} "
+            f"{change:+7.1f}%"
+        )
+
+
+async def run(args) -> dict:
+    results = {}
+    results.update(await bench_distance(args))
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or (
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        sessionmanager = DatabaseSessionManager()
+        sessionmanager.init(database_url)
+        try:
+            results.update(await bench_models(args, sessionmanager))
+        finally:
+            await sessionmanager.close()
+
+    results.update(await bench_geocoder(args))
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "size": args.size,
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--size", type=int, default=1000, help="seeded cafes")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--route-stops", type=int, default=500)
+    parser.add_argument("--creates", type=int, default=200)
+    parser.add_argument("--geocoder-calls", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None, help="write JSON here")
+    parser.add_argument(
+        "--compare", default=None, help="previous JSON to compare against"
+    )
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
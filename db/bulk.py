@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import Engine, delete, func, select, update
+
+from db.models import Cafe, Company, Menu
+
+
+class BulkProgress(NamedTuple):
+    table: str
+    done: int
+    total: int
+
+
+def chunks(identifiers, size: int):
+    identifiers = list(dict.fromkeys(identifiers))
+    for start in range(0, len(identifiers), size):
+        yield identifiers[start : start + size]
+
+
+def _count(engine: Engine, model, column, identifiers) -> int:
+    total = 0
+    with engine.connect() as connection:
+        for chunk in chunks(identifiers, 10_000):
+            total += connection.scalar(
+                select(func.count())
+                .select_from(model)
+                .where(column.in_(chunk))
+            )
+    return total
+
+
+def _delete_by_id(engine: Engine, model, identifiers, batch_size: int):
+    total = _count(engine, model, model.id, identifiers)
+    done = 0
+    for chunk in chunks(identifiers, batch_size):
+        # Children are removed by the ON DELETE CASCADE foreign keys, so
+        # nothing is loaded into the session.
+        with engine.begin() as connection:
+            done += connection.execute(
+                delete(model).where(model.id.in_(chunk))
+            ).rowcount
+        yield BulkProgress(model.__tablename__, done, total)
+
+
+def cafe_ids_of_companies(engine: Engine, company_ids):
+    with engine.connect() as connection:
+        return [
+            cafe_id
+            for chunk in chunks(company_ids, 10_000)
+            for cafe_id in connection.scalars(
+                select(Cafe.id).where(Cafe.company_id.in_(chunk))
+            )
+        ]
+
+
+def delete_menus(engine: Engine, menu_ids, batch_size: int = 1000):
+    yield from _delete_by_id(engine, Menu, menu_ids, batch_size)
+
+
+def delete_cafes(engine: Engine, cafe_ids, batch_size: int = 1000):
+    yield from _delete_by_id(engine, Cafe, cafe_ids, batch_size)
+
+
+def delete_companies(engine: Engine, company_ids, batch_size: int = 1000):
+    # cafes.company_id has no ON DELETE CASCADE, so cafes go first.
+    yield from delete_cafes(
+        engine, cafe_ids_of_companies(engine, company_ids), batch_size
+    )
+    yield from _delete_by_id(engine, Company, company_ids, batch_size)
+
+
+def _archive(engine: Engine, model, column, identifiers, batch_size, now):
+    total = _count(engine, model, column, identifiers)
+    done = 0
+    for chunk in chunks(identifiers, batch_size):
+        with engine.begin() as connection:
+            done += connection.execute(
+                update(model)
+                .where(column.in_(chunk))
+                .values(archived_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        yield BulkProgress(model.__tablename__, done, total)
+
+
+def archive_menus(engine: Engine, menu_ids, batch_size: int = 1000):
+    now = datetime.now()
+    yield from _archive(engine, Menu, Menu.id, menu_ids, batch_size, now)
+
+
+def archive_cafes(engine: Engine, cafe_ids, batch_size: int = 1000):
+    now = datetime.now()
+    yield from _archive(engine, Cafe, Cafe.id, cafe_ids, batch_size, now)
+    yield from _archive(
+        engine, Menu, Menu.cafe_id, cafe_ids, batch_size, now
+    )
+
+
+def archive_companies(engine: Engine, company_ids, batch_size: int = 1000):
+    now = datetime.now()
+    yield from _archive(
+        engine, Company, Company.id, company_ids, batch_size, now
+    )
+    cafe_ids = cafe_ids_of_companies(engine, company_ids)
+    yield from _archive(engine, Cafe, Cafe.id, cafe_ids, batch_size, now)
+    yield from _archive(
+        engine, Menu, Menu.cafe_id, cafe_ids, batch_size, now
+    )
@@ -30,6 +30,10 @@ class BaseModel(Base):
     __abstract__ = True
     id = Column(String, primary_key=True)
     created_at = Column(DateTime, default=datetime.now)
+    # Read by the response cache to tell whether a table changed.
+    updated_at = Column(
+        DateTime, default=datetime.now, onupdate=datetime.now, index=True
+    )
 
     @classmethod
     async def create(
@@ -87,6 +91,7 @@ class Company(BaseModel):
 
     description_ru = Column(String, default="Нет описания.")
     logo = Column(String, default=None)
+    archived_at = Column(DateTime, default=None)
 
     cafes = relationship(
         "Cafe",
@@ -107,6 +112,7 @@ class Cafe(BaseModel):
         ForeignKey("companies.id"),
         nullable=False,
     )
+    archived_at = Column(DateTime, default=None)
     company = relationship(
         "Company",
         back_populates="cafes",
@@ -158,6 +164,7 @@ class Geodata(BaseModel):
         Numeric(7, 4),
         nullable=False,
         unique=False,
+        index=True,
     )
     longitude = Column(
         Numeric(7, 4),
@@ -203,10 +210,12 @@ class Geodata(BaseModel):
     ):
         stmt = (
             select(cls)
+            .outerjoin(Cafe, cls.cafe_id == Cafe.id)
             .filter(
                 and_(
-                    cls.country == country,
-                    cls.city == city,
+                    cls.country_id == country,
+                    cls.city_id == city,
+                    Cafe.archived_at.is_(None),
                 )
             )
             .options(
@@ -222,6 +231,19 @@ class Geodata(BaseModel):
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    @classmethod
+    async def get_coordinates(cls, db: AsyncSession, cafe_ids):
+        stmt = (
+            select(cls.cafe_id, cls.latitude, cls.longitude)
+            .join(Cafe, cls.cafe_id == Cafe.id)
+            .filter(
+                cls.cafe_id.in_(list(cafe_ids)),
+                Cafe.archived_at.is_(None),
+            )
+        )
+        result = await db.execute(stmt)
+        return result.all()
+
     def __repr__(self):
         try:
             return f"{self.country.name_ru}, {self.city.name_ru}, {self.address}"
@@ -261,6 +283,7 @@ class Menu(BaseModel):
         String,
         ForeignKey("cafes.id", ondelete="CASCADE"),
     )
+    archived_at = Column(DateTime, default=None)
     cafe = relationship(
         "Cafe",
         back_populates="menu",
@@ -271,8 +294,24 @@ class Menu(BaseModel):
         "MenuEntry",
         back_populates="menu",
         cascade="all, delete, delete-orphan",
+        passive_deletes=True,
     )
 
+    @classmethod
+    async def get_by_cafe(cls, db: AsyncSession, cafe_id: str):
+        stmt = (
+            select(cls)
+            .join(Cafe, cls.cafe_id == Cafe.id)
+            .filter(
+                cls.cafe_id == cafe_id,
+                cls.archived_at.is_(None),
+                Cafe.archived_at.is_(None),
+            )
+            .options(selectinload(cls.entries))
+        )
+        result = await db.execute(stmt)
+        return result.unique().scalars().first()
+
     def __repr__(self):
         try:
             return f"Меню {self.cafe.company.name_ru or self.cafe.company.name}"
@@ -307,6 +346,39 @@ class MenuEntry(BaseModel):
         ForeignKey("currencies.id", ondelete="CASCADE"),
     )
 
+    @classmethod
+    async def get_all_by_price(
+        cls,
+        db: AsyncSession,
+        currency: int,
+        descending: bool = False,
+        skip: int = 0,
+        limit: int = 100,
+    ):
+        target_rate = (
+            select(CurrencyRate.rate)
+            .filter(CurrencyRate.currency_id == currency)
+            .scalar_subquery()
+        )
+        converted_price = (cls.price * CurrencyRate.rate / target_rate).label(
+            "converted_price"
+        )
+        stmt = (
+            select(cls, converted_price)
+            .join(CurrencyRate, CurrencyRate.currency_id == cls.currency_id)
+            .join(Menu, cls.menu_id == Menu.id)
+            .join(Cafe, Menu.cafe_id == Cafe.id)
+            .filter(Menu.archived_at.is_(None), Cafe.archived_at.is_(None))
+            .order_by(
+                converted_price.desc() if descending else converted_price,
+                cls.id,
+            )
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+        return result.all()
+
     def __repr__(self):
         return f"{self.name}"
 
@@ -318,6 +390,9 @@ class Currency(Base):
     code = Column(String, unique=True, nullable=False)
     name = Column(String, unique=True, nullable=False)
     name_ru = Column(String, unique=True, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.now, onupdate=datetime.now, index=True
+    )
     entries = relationship(
         "MenuEntry",
         back_populates="currency",
@@ -328,6 +403,31 @@ class Currency(Base):
         return f"{self.name_ru} ({self.code})"
 
 
+class CurrencyRate(Base):
+    __tablename__ = "currency_rates"
+
+    currency_id = Column(
+        Integer,
+        ForeignKey("currencies.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    currency = relationship("Currency", lazy="joined")
+    # Value of one unit of the currency in a common base currency.
+    rate = Column(Float, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.now, onupdate=datetime.now, index=True
+    )
+
+    @classmethod
+    async def get_by_code(cls, db: AsyncSession, code: str):
+        stmt = select(cls).join(Currency).filter(Currency.code == code)
+        result = await db.execute(stmt)
+        return result.scalars().first()
+
+    def __repr__(self):
+        return f"{self.currency}: {self.rate}"
+
+
 class Country(Base):
     __tablename__ = "countries"
 
@@ -359,6 +459,9 @@ class City(Base):
         nullable=False,
     )
     name_ru = Column(String, unique=True, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.now, onupdate=datetime.now, index=True
+    )
     geodata = relationship("Geodata", back_populates="city")
 
     country_id = Column(
@@ -380,26 +483,131 @@ class City(Base):
         skip: int = 0,
         limit: int = 100,
     ):
+        # Pages are taken over the city's cafes, not over the cities.
         stmt = (
-            select(cls)
-            .filter(cls.name == city)
-            .options(
-                selectinload(cls.geodata)
-                .selectinload(Geodata.cafe)
-                .selectinload(Cafe.company),
-                selectinload(cls.geodata)
-                .selectinload(Geodata.cafe)
-                .selectinload(Cafe.review),
-            )
+            select(Cafe)
+            .join(Geodata, Geodata.cafe_id == Cafe.id)
+            .join(cls, Geodata.city_id == cls.id)
+            .filter(cls.name == city, Cafe.archived_at.is_(None))
+            .options(selectinload(Cafe.review))
+            .order_by(Cafe.id)
             .offset(skip)
             .limit(limit)
         )
-
-        return [
-            geodata.cafe
-            for city_instance in (await db.execute(stmt)).scalars().all()
-            for geodata in city_instance.geodata
-        ]
+        result = await db.execute(stmt)
+        return result.scalars().unique().all()
 
     def __repr__(self):
         return f"Город {self.name_ru} ({self.code})"
+
+
+class CafeSummary(Base):
+    __tablename__ = "cafe_summaries"
+
+    cafe_id = Column(
+        String,
+        ForeignKey("cafes.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    company_id = Column(
+        String,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        index=True,
+    )
+    entry_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_avg = Column(Float)
+    updated_at = Column(DateTime, default=datetime.now)
+
+    prices = relationship(
+        "CafePriceSummary",
+        primaryjoin="CafeSummary.cafe_id == foreign(CafePriceSummary.cafe_id)",
+        lazy="selectin",
+        viewonly=True,
+    )
+
+    @classmethod
+    async def get_for_cafes(cls, db: AsyncSession, cafe_ids):
+        stmt = select(cls).filter(cls.cafe_id.in_(list(cafe_ids)))
+        result = await db.execute(stmt)
+        return {summary.cafe_id: summary for summary in result.scalars()}
+
+
+class CafePriceSummary(Base):
+    __tablename__ = "cafe_price_summaries"
+
+    cafe_id = Column(
+        String,
+        ForeignKey("cafes.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    currency_id = Column(
+        Integer,
+        ForeignKey("currencies.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    entry_count = Column(Integer, nullable=False, default=0)
+    price_min = Column(Float)
+    price_avg = Column(Float)
+    price_max = Column(Float)
+
+
+class CompanySummary(Base):
+    __tablename__ = "company_summaries"
+
+    company_id = Column(
+        String,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    cafe_count = Column(Integer, nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_avg = Column(Float)
+    updated_at = Column(DateTime, default=datetime.now)
+
+    prices = relationship(
+        "CompanyPriceSummary",
+        primaryjoin=(
+            "CompanySummary.company_id == "
+            "foreign(CompanyPriceSummary.company_id)"
+        ),
+        lazy="selectin",
+        viewonly=True,
+    )
+
+    @classmethod
+    async def get_for_companies(cls, db: AsyncSession, company_ids):
+        stmt = select(cls).filter(cls.company_id.in_(list(company_ids)))
+        result = await db.execute(stmt)
+        return {
+            summary.company_id: summary for summary in result.scalars()
+        }
+
+
+class CompanyPriceSummary(Base):
+    __tablename__ = "company_price_summaries"
+
+    company_id = Column(
+        String,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    currency_id = Column(
+        Integer,
+        ForeignKey("currencies.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    entry_count = Column(Integer, nullable=False, default=0)
+    price_min = Column(Float)
+    price_avg = Column(Float)
+    price_max = Column(Float)
+
+
+class TableVersion(Base):
+    # Bumped on every write the application makes to a table, so response
+    # validators can be read from here instead of scanning the tables.
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
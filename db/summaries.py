@@ -0,0 +1,250 @@
+from datetime import datetime
+
+from sqlalchemy import Connection, delete, func, insert, literal, select
+
+from db.models import (
+    Cafe,
+    CafePriceSummary,
+    CafeSummary,
+    Company,
+    CompanyPriceSummary,
+    CompanySummary,
+    Menu,
+    MenuEntry,
+    Review,
+)
+from db.table_versions import bump_table_versions
+
+SUMMARY_TABLES = [
+    CafeSummary.__table__,
+    CafePriceSummary.__table__,
+    CompanySummary.__table__,
+    CompanyPriceSummary.__table__,
+]
+
+
+def create_summary_tables(connection: Connection):
+    for table in SUMMARY_TABLES:
+        table.create(connection, checkfirst=True)
+
+
+def _scoped(stmt, column, identifiers):
+    if identifiers is None:
+        return stmt
+    return stmt.where(column.in_(identifiers))
+
+
+def _lock(connection: Connection, column, identifiers):
+    # Two refreshes of the same rows would both delete and then both
+    # insert. Locking the parent rows in id order makes the second wait
+    # until the first has committed.
+    connection.execute(
+        _scoped(select(column), column, identifiers)
+        .order_by(column)
+        .with_for_update()
+    )
+
+
+def refresh_cafe_summaries(connection: Connection, cafe_ids=None):
+    if cafe_ids is not None:
+        cafe_ids = list(cafe_ids)
+        if not cafe_ids:
+            return
+
+    # Archived cafes get no summary and archived menus are not counted.
+    entry_count = (
+        select(func.count(MenuEntry.id))
+        .join(Menu, MenuEntry.menu_id == Menu.id)
+        .where(Menu.cafe_id == Cafe.id, Menu.archived_at.is_(None))
+        .scalar_subquery()
+    )
+    review_count = (
+        select(func.count(Review.id))
+        .where(Review.cafe_id == Cafe.id)
+        .scalar_subquery()
+    )
+    rating_avg = (
+        select(func.avg(Review.rating))
+        .where(Review.cafe_id == Cafe.id)
+        .scalar_subquery()
+    )
+    prices = (
+        select(
+            Menu.cafe_id,
+            MenuEntry.currency_id,
+            func.count(MenuEntry.id),
+            func.min(MenuEntry.price),
+            func.avg(MenuEntry.price),
+            func.max(MenuEntry.price),
+        )
+        .join(Menu, MenuEntry.menu_id == Menu.id)
+        .join(Cafe, Menu.cafe_id == Cafe.id)
+        .where(
+            MenuEntry.currency_id.is_not(None),
+            Menu.archived_at.is_(None),
+            Cafe.archived_at.is_(None),
+        )
+        .group_by(Menu.cafe_id, MenuEntry.currency_id)
+    )
+
+    _lock(connection, Cafe.id, cafe_ids)
+    connection.execute(
+        _scoped(delete(CafePriceSummary), CafePriceSummary.cafe_id, cafe_ids)
+    )
+    connection.execute(
+        _scoped(delete(CafeSummary), CafeSummary.cafe_id, cafe_ids)
+    )
+    connection.execute(
+        insert(CafeSummary).from_select(
+            [
+                "cafe_id",
+                "company_id",
+                "entry_count",
+                "review_count",
+                "rating_avg",
+                "updated_at",
+            ],
+            _scoped(
+                select(
+                    Cafe.id,
+                    Cafe.company_id,
+                    entry_count,
+                    review_count,
+                    rating_avg,
+                    literal(datetime.now()),
+                ).where(Cafe.archived_at.is_(None)),
+                Cafe.id,
+                cafe_ids,
+            ),
+        )
+    )
+    connection.execute(
+        insert(CafePriceSummary).from_select(
+            [
+                "cafe_id",
+                "currency_id",
+                "entry_count",
+                "price_min",
+                "price_avg",
+                "price_max",
+            ],
+            _scoped(prices, Menu.cafe_id, cafe_ids),
+        )
+    )
+    bump_table_versions(
+        connection,
+        [CafeSummary.__tablename__, CafePriceSummary.__tablename__],
+    )
+
+
+def refresh_company_summaries(connection: Connection, company_ids=None):
+    if company_ids is not None:
+        company_ids = list(company_ids)
+        if not company_ids:
+            return
+
+    # Company averages are weighted by the number of rows behind each
+    # cafe summary, so they match an average over the raw rows.
+    totals = select(
+        CafeSummary.company_id,
+        func.count(CafeSummary.cafe_id),
+        func.coalesce(func.sum(CafeSummary.entry_count), 0),
+        func.coalesce(func.sum(CafeSummary.review_count), 0),
+        func.sum(CafeSummary.rating_avg * CafeSummary.review_count)
+        / func.nullif(func.sum(CafeSummary.review_count), 0),
+        literal(datetime.now()),
+    ).group_by(CafeSummary.company_id)
+    prices = (
+        select(
+            CafeSummary.company_id,
+            CafePriceSummary.currency_id,
+            func.sum(CafePriceSummary.entry_count),
+            func.min(CafePriceSummary.price_min),
+            func.sum(CafePriceSummary.price_avg * CafePriceSummary.entry_count)
+            / func.sum(CafePriceSummary.entry_count),
+            func.max(CafePriceSummary.price_max),
+        )
+        .join(
+            CafeSummary,
+            CafePriceSummary.cafe_id == CafeSummary.cafe_id,
+        )
+        .group_by(CafeSummary.company_id, CafePriceSummary.currency_id)
+    )
+
+    _lock(connection, Company.id, company_ids)
+    connection.execute(
+        _scoped(
+            delete(CompanyPriceSummary),
+            CompanyPriceSummary.company_id,
+            company_ids,
+        )
+    )
+    connection.execute(
+        _scoped(delete(CompanySummary), CompanySummary.company_id, company_ids)
+    )
+    connection.execute(
+        insert(CompanySummary).from_select(
+            [
+                "company_id",
+                "cafe_count",
+                "entry_count",
+                "review_count",
+                "rating_avg",
+                "updated_at",
+            ],
+            _scoped(totals, CafeSummary.company_id, company_ids),
+        )
+    )
+    connection.execute(
+        insert(CompanyPriceSummary).from_select(
+            [
+                "company_id",
+                "currency_id",
+                "entry_count",
+                "price_min",
+                "price_avg",
+                "price_max",
+            ],
+            _scoped(prices, CafeSummary.company_id, company_ids),
+        )
+    )
+    bump_table_versions(
+        connection,
+        [CompanySummary.__tablename__, CompanyPriceSummary.__tablename__],
+    )
+
+
+def refresh_summaries(connection: Connection, cafe_ids=(), menu_ids=()):
+    cafe_ids = {cafe_id for cafe_id in cafe_ids if cafe_id}
+    menu_ids = [menu_id for menu_id in menu_ids if menu_id]
+    if menu_ids:
+        cafe_ids.update(
+            connection.scalars(
+                select(Menu.cafe_id).where(Menu.id.in_(menu_ids))
+            )
+        )
+    cafe_ids.discard(None)
+    if not cafe_ids:
+        return
+
+    previous_company_ids = set(
+        connection.scalars(
+            select(CafeSummary.company_id).where(
+                CafeSummary.cafe_id.in_(cafe_ids)
+            )
+        )
+    )
+    refresh_cafe_summaries(connection, cafe_ids)
+    company_ids = previous_company_ids | set(
+        connection.scalars(
+            select(Cafe.company_id).where(Cafe.id.in_(cafe_ids))
+        )
+    )
+    company_ids.discard(None)
+    refresh_company_summaries(connection, company_ids)
+
+
+def rebuild_summaries(connection: Connection):
+    create_summary_tables(connection)
+    refresh_cafe_summaries(connection)
+    refresh_company_summaries(connection)
@@ -0,0 +1,56 @@
+from sqlalchemy import Connection, insert, select, update
+
+from db.main import Base
+from db.models import TableVersion
+
+
+def cascaded_tables(names) -> set:
+    # The tables plus every table whose rows go with theirs through a
+    # foreign key, which deletes and archives reach without the ORM.
+    names = set(names)
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        for table in Base.metadata.sorted_tables:
+            if table.name not in names and any(
+                key.column.table.name == name for key in table.foreign_keys
+            ):
+                names.add(table.name)
+                pending.append(table.name)
+    return names
+
+
+def versions_query(names):
+    return (
+        select(TableVersion.name, TableVersion.version)
+        .where(TableVersion.name.in_(sorted(names)))
+        .order_by(TableVersion.name)
+    )
+
+
+def create_table_versions(connection: Connection) -> int:
+    existing = set(connection.scalars(select(TableVersion.name)))
+    missing = [
+        {"name": table.name, "version": 0}
+        for table in Base.metadata.sorted_tables
+        if table.name not in existing and table is not TableVersion.__table__
+    ]
+    if missing:
+        connection.execute(insert(TableVersion), missing)
+    return len(missing)
+
+
+def bump_table_versions(connection: Connection, names):
+    names = sorted(names)
+    # Rows are locked in name order so concurrent bumps cannot deadlock.
+    connection.execute(
+        select(TableVersion.name)
+        .where(TableVersion.name.in_(names))
+        .order_by(TableVersion.name)
+        .with_for_update()
+    )
+    connection.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(names))
+        .values(version=TableVersion.version + 1)
+    )
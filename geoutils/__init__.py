@@ -1,3 +1,22 @@
 from geoutils.coordinates_processor import (
     CoordinatesProcessor,
 )
+from geoutils.deduplicator import (
+    DuplicateCandidate,
+    find_duplicates,
+)
+from geoutils.location_snapshot import (
+    LocationSnapshot,
+)
+from geoutils.reverse_geocoder import (
+    GeocodedAddress,
+    ReverseGeocoder,
+)
+from geoutils.route_planner import (
+    Route,
+    RoutePlanner,
+)
+from geoutils.spatial_index import (
+    METERS_PER_DEGREE,
+    GridIndex,
+)
@@ -2,8 +2,36 @@ import math
 
 import requests
 
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(
+    lat_a: float,
+    lon_a: float,
+    lat_b: float,
+    lon_b: float,
+) -> float:
+    lon1, lat1, lon2, lat2 = map(
+        math.radians,
+        [lon_a, lat_a, lon_b, lat_b],
+    )
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    )
+    c = 2 * math.asin(math.sqrt(a))
+    return c * EARTH_RADIUS_KM  # Determines return value units.
+
 
 class CoordinatesProcessor:
+    base_url = (
+        "https://geocode.arcgis.com/arcgis/rest/services/World/GeocodeServer"
+    )
+
     def __init__(self):
         pass
 
@@ -14,21 +42,7 @@ class CoordinatesProcessor:
         lat_b: float,
         lon_b: float,
     ):
-        lon1, lat1, lon2, lat2 = map(
-            math.radians,
-            [lon_a, lat_a, lon_b, lat_b],
-        )
-
-        # haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = (
-            math.sin(dlat / 2) ** 2
-            + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-        )
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Radius of earth in kilometers. Use 3956 for miles. Determines return value units.
-        return c * r
+        return haversine(lat_a, lon_a, lat_b, lon_b)
 
     @classmethod
     async def coordinates_to_bbox(cls, latitude: float, longitude: float):
@@ -50,10 +64,7 @@ class CoordinatesProcessor:
 
     @classmethod
     async def address_to_coordinates(cls, address: str):
-        query = (
-            f"https://geocode.arcgis.com/arcgis/rest/services/World/"
-            f"GeocodeServer/find?f=json&text={address}"
-        )
+        query = f"{cls.base_url}/find?f=json&text={address}"
         res = requests.get(query).json()["locations"][0]["feature"][
             "geometry"
         ]
@@ -65,8 +76,7 @@ class CoordinatesProcessor:
     @classmethod
     async def coordinates_to_address(cls, lat: float, lon: float):
         query = (
-            f"https://geocode.arcgis.com/arcgis/rest/services/World/"
-            f"GeocodeServer/reverseGeocode?location={lon},{lat}&f=pjson"
+            f"{cls.base_url}/reverseGeocode?location={lon},{lat}&f=pjson"
         )
         res = requests.get(query).json()
         print(res)
@@ -0,0 +1,151 @@
+import math
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from operator import itemgetter
+from typing import NamedTuple
+
+from geoutils.coordinates_processor import haversine
+from geoutils.spatial_index import METERS_PER_DEGREE
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_NUMBER = re.compile(r"\d+")
+
+
+class DuplicateCandidate(NamedTuple):
+    id_a: str
+    id_b: str
+    distance_m: float
+    similarity: float
+
+
+def normalize_address(address: str | None) -> str:
+    return _NON_WORD.sub(" ", (address or "").lower()).strip()
+
+
+def _address_key(address: str | None):
+    normalized = normalize_address(address)
+    words = set()
+    for token in normalized.split():
+        if not token.isdigit():
+            words.add(token)
+    return normalized, frozenset(_NUMBER.findall(normalized)), words
+
+
+def _may_match(key_a, key_b) -> bool:
+    _, numbers_a, words_a = key_a
+    _, numbers_b, words_b = key_b
+    # Different house numbers on the same street are different buildings,
+    # and addresses with no word in common are never close enough; both
+    # checks are much cheaper than SequenceMatcher.
+    if numbers_a and numbers_b and numbers_a.isdisjoint(numbers_b):
+        return False
+    if words_a and words_b and words_a.isdisjoint(words_b):
+        return False
+    return True
+
+
+def address_similarity(a: str, b: str, minimum: float = 0.0) -> float:
+    if a == b:
+        return 1.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # The cheap upper bounds rule out most pairs without the full diff.
+    for bound in (matcher.real_quick_ratio, matcher.quick_ratio):
+        upper = bound()
+        if upper < minimum:
+            return upper
+    return matcher.ratio()
+
+
+def find_duplicates(
+    points,
+    threshold_meters: float = 30.0,
+    min_similarity: float = 0.6,
+) -> list[DuplicateCandidate]:
+    # Points are bucketed into rows one threshold tall and each row is
+    # sorted by longitude. A pair within the threshold lies in the same
+    # or in adjacent rows, so every point is swept against the points of
+    # its own row and of the next one that are within one threshold of
+    # longitude, which is a few candidates per point even in a dense
+    # city.
+    row_degrees = threshold_meters / METERS_PER_DEGREE
+    rows = defaultdict(list)
+    for identifier, lat, lon, address in points:
+        lat, lon = float(lat), float(lon)
+        rows[math.floor(lat / row_degrees)].append(
+            (lon, lat, identifier, address)
+        )
+    for bucket in rows.values():
+        bucket.sort(key=itemgetter(0))
+
+    # The planar check only rules pairs out, so it gets some slack over
+    # the haversine distance it stands in for.
+    limit = (threshold_meters * 1.01) ** 2
+    candidates = []
+    keys = {}
+
+    def compare(point_a, point_b):
+        lon_a, lat_a, id_a, address_a = point_a
+        lon_b, lat_b, id_b, address_b = point_b
+        # Addresses are cheap to rule out once their keys are cached, so
+        # the exact distance is only computed for pairs that may match.
+        for address in (address_a, address_b):
+            if address not in keys:
+                keys[address] = _address_key(address)
+        key_a, key_b = keys[address_a], keys[address_b]
+        if not _may_match(key_a, key_b):
+            return
+        distance = haversine(lat_a, lon_a, lat_b, lon_b) * 1000
+        if distance > threshold_meters:
+            return
+        similarity = address_similarity(key_a[0], key_b[0], min_similarity)
+        if similarity >= min_similarity:
+            candidates.append(
+                DuplicateCandidate(id_a, id_b, distance, similarity)
+            )
+
+    lat_scale = METERS_PER_DEGREE
+    for row, bucket in rows.items():
+        next_bucket = rows.get(row + 1, ())
+        size, next_size = len(bucket), len(next_bucket)
+        if size == 1 and not next_size:
+            continue
+        edge = min((abs(row) + 2) * row_degrees, 89.9)
+        width = row_degrees / math.cos(math.radians(edge))
+        lon_scale = METERS_PER_DEGREE * math.cos(
+            math.radians((row + 0.5) * row_degrees)
+        )
+        # Both rows are sorted by longitude, so the first point of the
+        # next row that is still in range only ever moves forward.
+        start = 0
+        for i in range(size):
+            point = bucket[i]
+            lon, lat = point[0], point[1]
+            j = i + 1
+            while j < size:
+                other = bucket[j]
+                d_lon = other[0] - lon
+                if d_lon > width:
+                    break
+                d_lat = (other[1] - lat) * lat_scale
+                d_lon *= lon_scale
+                if d_lat * d_lat + d_lon * d_lon <= limit:
+                    compare(point, other)
+                j += 1
+            low = lon - width
+            while start < next_size and next_bucket[start][0] < low:
+                start += 1
+            j = start
+            while j < next_size:
+                other = next_bucket[j]
+                d_lon = other[0] - lon
+                if d_lon > width:
+                    break
+                d_lat = (other[1] - lat) * lat_scale
+                d_lon *= lon_scale
+                if d_lat * d_lat + d_lon * d_lon <= limit:
+                    compare(point, other)
+                j += 1
+
+    candidates.sort(key=lambda c: (c.distance_m, -c.similarity))
+    return candidates
@@ -0,0 +1,187 @@
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b"W2CLOCS"
+VERSION = 2
+# magic, version, count, coordinate item size, id width, code width
+HEADER = struct.Struct("<7sBQIII")
+ALIGNMENT = 8
+COORDINATE_FORMATS = {4: "f", 8: "d"}
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _encode(value, width: int) -> bytes:
+    return (value or "").encode().ljust(width, b"\0")
+
+
+class LocationSnapshot:
+    def __init__(self, buffer, count, coordinate_size, id_width, code_width):
+        self._buffer = buffer
+        self._count = count
+        self.id_width = id_width
+        self.code_width = code_width
+
+        view = memoryview(buffer)
+        offset = _aligned(HEADER.size)
+        coordinates_size = count * coordinate_size
+        coordinate_format = COORDINATE_FORMATS[coordinate_size]
+        self.latitudes = view[offset : offset + coordinates_size].cast(
+            coordinate_format
+        )
+        offset = _aligned(offset + coordinates_size)
+        self.longitudes = view[offset : offset + coordinates_size].cast(
+            coordinate_format
+        )
+        offset = _aligned(offset + coordinates_size)
+        self._ids = view[offset : offset + count * id_width]
+        offset = _aligned(offset + count * id_width)
+        self._city_codes = view[offset : offset + count * code_width]
+        offset += count * code_width
+        self._country_codes = view[offset : offset + count * code_width]
+
+    @classmethod
+    def write(cls, path: str, rows, double_precision: bool = True) -> int:
+        rows = [
+            (str(identifier), float(lat), float(lon), city, country)
+            for identifier, lat, lon, city, country in rows
+        ]
+        # Rows are stored in id byte order so position() can binary-search
+        # the fixed-width id column instead of building an index.
+        rows.sort(key=lambda row: row[0].encode())
+        coordinate_size = 8 if double_precision else 4
+        coordinate_format = COORDINATE_FORMATS[coordinate_size]
+        id_width = max((len(row[0].encode()) for row in rows), default=0)
+        code_width = max(
+            (
+                len((code or "").encode())
+                for row in rows
+                for code in row[3:]
+            ),
+            default=0,
+        )
+
+        sections = [
+            struct.pack(
+                f"<{len(rows)}{coordinate_format}", *(row[1] for row in rows)
+            ),
+            struct.pack(
+                f"<{len(rows)}{coordinate_format}", *(row[2] for row in rows)
+            ),
+            b"".join(_encode(row[0], id_width) for row in rows),
+            b"".join(_encode(row[3], code_width) for row in rows)
+            + b"".join(_encode(row[4], code_width) for row in rows),
+        ]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(
+                    HEADER.pack(
+                        MAGIC,
+                        VERSION,
+                        len(rows),
+                        coordinate_size,
+                        id_width,
+                        code_width,
+                    )
+                )
+                for section in sections:
+                    file.write(b"\0" * (_aligned(file.tell()) - file.tell()))
+                    file.write(section)
+            # mkstemp creates the file as 0600.
+            os.chmod(tmp_path, 0o644)
+            # Workers that already mapped the old file keep reading it; the
+            # rename only affects the next load.
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(rows)
+
+    @classmethod
+    def load(cls, path: str) -> "LocationSnapshot":
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, coordinate_size, id_width, code_width = (
+            HEADER.unpack_from(buffer)
+        )
+        if magic != MAGIC or version != VERSION:
+            buffer.close()
+            raise ValueError(f"{path} is not a location snapshot")
+        return cls(buffer, count, coordinate_size, id_width, code_width)
+
+    def close(self):
+        for view in (
+            self.latitudes,
+            self.longitudes,
+            self._ids,
+            self._city_codes,
+            self._country_codes,
+        ):
+            view.release()
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _field(view, width: int, position: int) -> str:
+        start = position * width
+        return bytes(view[start : start + width]).rstrip(b"\0").decode()
+
+    def id(self, position: int) -> str:
+        return self._field(self._ids, self.id_width, position)
+
+    def city_code(self, position: int) -> str:
+        return self._field(self._city_codes, self.code_width, position)
+
+    def country_code(self, position: int) -> str:
+        return self._field(self._country_codes, self.code_width, position)
+
+    def position(self, identifier: str) -> int | None:
+        width = self.id_width
+        key = identifier.encode()
+        if len(key) > width:
+            return None
+        key = key.ljust(width, b"\0")
+        ids = self._ids
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = middle * width
+            if bytes(ids[start : start + width]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        start = low * width
+        if low < self._count and bytes(ids[start : start + width]) == key:
+            return low
+        return None
+
+    def coordinates(self, identifier: str):
+        position = self.position(identifier)
+        if position is None:
+            return None
+        return self.latitudes[position], self.longitudes[position]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield (
+                self.id(position),
+                self.latitudes[position],
+                self.longitudes[position],
+                self.city_code(position),
+                self.country_code(position),
+            )
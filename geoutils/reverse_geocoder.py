@@ -0,0 +1,187 @@
+import time
+from typing import NamedTuple
+
+from geoutils.coordinates_processor import CoordinatesProcessor
+from geoutils.spatial_index import GridIndex
+
+
+class GeocodedAddress(NamedTuple):
+    address: str
+    city_id: int | None = None
+    country_id: int | None = None
+
+
+class _Centroids:
+    def __init__(self, radius_km: float):
+        self.radius_meters = radius_km * 1000
+        self._sums = {}
+        self._index = None
+
+    def add(self, key, lat: float, lon: float, parent=None):
+        acc = self._sums.setdefault(key, [0.0, 0.0, 0, parent])
+        acc[0] += lat
+        acc[1] += lon
+        acc[2] += 1
+        if acc[3] is None:
+            acc[3] = parent
+        self._index = None
+
+    def remove(self, key, lat: float, lon: float):
+        acc = self._sums.get(key)
+        if acc is None:
+            return
+        acc[0] -= lat
+        acc[1] -= lon
+        acc[2] -= 1
+        if acc[2] <= 0:
+            del self._sums[key]
+        self._index = None
+
+    def nearest(self, lat: float, lon: float):
+        if self._index is None:
+            self._index = GridIndex(self.radius_meters)
+            for key, (lat_sum, lon_sum, count, parent) in self._sums.items():
+                self._index.add(
+                    lat_sum / count, lon_sum / count, (key, parent)
+                )
+        match, _ = self._index.nearest(lat, lon, self.radius_meters)
+        return match or (None, None)
+
+
+class _Index(NamedTuple):
+    entries: dict
+    addresses: GridIndex
+    cities: _Centroids
+    countries: _Centroids
+
+
+class ReverseGeocoder:
+    def __init__(
+        self,
+        tolerance_meters: float = 25.0,
+        city_radius_km: float = 50.0,
+        country_radius_km: float = 1000.0,
+        ttl: float | None = None,
+    ):
+        self.tolerance_meters = tolerance_meters
+        self.city_radius_km = city_radius_km
+        self.country_radius_km = country_radius_km
+        self.ttl = ttl
+        self.loaded_at = None
+        self._state = self._empty()
+
+    def _empty(self) -> _Index:
+        return _Index(
+            {},
+            GridIndex(self.tolerance_meters),
+            _Centroids(self.city_radius_km),
+            _Centroids(self.country_radius_km),
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def expired(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    def invalidate(self):
+        # The next get reloads everything; lookups keep the current index
+        # until then.
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._state.addresses)
+
+    def load(self, rows):
+        state = self._empty()
+        for row in rows:
+            self._add(state, *row)
+        # Lookups see either the old index or the new one, never a
+        # partly filled one.
+        self._state = state
+        self.loaded_at = time.monotonic()
+
+    def add(
+        self,
+        identifier: str,
+        lat: float,
+        lon: float,
+        address: str,
+        city_id: int | None = None,
+        country_id: int | None = None,
+    ):
+        self._add(
+            self._state, identifier, lat, lon, address, city_id, country_id
+        )
+
+    @classmethod
+    def _add(cls, state, identifier, lat, lon, address, city_id, country_id):
+        # Re-adding an id replaces its entry, so edited rows do not leave
+        # their old address behind.
+        cls._remove(state, identifier)
+        lat, lon = float(lat), float(lon)
+        item = (identifier, address, city_id, country_id)
+        state.entries[identifier] = (lat, lon, item)
+        state.addresses.add(lat, lon, item)
+        if city_id is not None:
+            state.cities.add(city_id, lat, lon, country_id)
+        if country_id is not None:
+            state.countries.add(country_id, lat, lon)
+
+    def remove(self, identifier: str):
+        self._remove(self._state, identifier)
+
+    @staticmethod
+    def _remove(state, identifier):
+        entry = state.entries.pop(identifier, None)
+        if entry is None:
+            return
+        lat, lon, item = entry
+        _, _, city_id, country_id = item
+        state.addresses.remove(lat, lon, item)
+        if city_id is not None:
+            state.cities.remove(city_id, lat, lon)
+        if country_id is not None:
+            state.countries.remove(country_id, lat, lon)
+
+    def locate_city(self, lat: float, lon: float):
+        state = self._state
+        city_id, country_id = state.cities.nearest(lat, lon)
+        if country_id is None:
+            country_id, _ = state.countries.nearest(lat, lon)
+        return city_id, country_id
+
+    def locate(
+        self, lat: float, lon: float, exclude: str | None = None
+    ) -> GeocodedAddress | None:
+        lat, lon = float(lat), float(lon)
+        match, _ = self._state.addresses.nearest(
+            lat,
+            lon,
+            self.tolerance_meters,
+            skip=None if exclude is None else lambda i: i[0] == exclude,
+        )
+        if match is None:
+            return None
+        _, address, city_id, country_id = match
+        if city_id is None or country_id is None:
+            near_city_id, near_country_id = self.locate_city(lat, lon)
+            city_id = city_id if city_id is not None else near_city_id
+            if country_id is None:
+                country_id = near_country_id
+        return GeocodedAddress(address, city_id, country_id)
+
+    async def coordinates_to_address(
+        self, lat: float, lon: float, exclude: str | None = None
+    ) -> GeocodedAddress:
+        local = self.locate(lat, lon, exclude)
+        if local is not None:
+            return local
+        address = await CoordinatesProcessor.coordinates_to_address(lat, lon)
+        city_id, country_id = self.locate_city(float(lat), float(lon))
+        return GeocodedAddress(address, city_id, country_id)
@@ -0,0 +1,160 @@
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import NamedTuple
+
+from geoutils.coordinates_processor import EARTH_RADIUS_KM
+
+
+class Route(NamedTuple):
+    stops: list
+    distance_km: float
+
+
+def distance_matrix(coordinates) -> list[list[float]]:
+    # Radians and cosines are computed once per stop instead of once per
+    # pair, and each pair is only computed once.
+    lats = [math.radians(float(lat)) for lat, _ in coordinates]
+    lons = [math.radians(float(lon)) for _, lon in coordinates]
+    cos_lats = [math.cos(lat) for lat in lats]
+    size = len(lats)
+    matrix = [[0.0] * size for _ in range(size)]
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS_KM
+    for i in range(size):
+        lat_i, lon_i, cos_i = lats[i], lons[i], cos_lats[i]
+        row = matrix[i]
+        for j in range(i + 1, size):
+            a = (
+                sin((lats[j] - lat_i) / 2) ** 2
+                + cos_i * cos_lats[j] * sin((lons[j] - lon_i) / 2) ** 2
+            )
+            row[j] = matrix[j][i] = diameter * asin(sqrt(min(a, 1.0)))
+    return matrix
+
+
+def nearest_neighbour_tour(matrix, start: int = 0) -> list[int]:
+    unvisited = set(range(len(matrix)))
+    unvisited.discard(start)
+    tour = [start]
+    while unvisited:
+        row = matrix[tour[-1]]
+        nearest = min(unvisited, key=row.__getitem__)
+        unvisited.remove(nearest)
+        tour.append(nearest)
+    return tour
+
+
+def two_opt(tour: list[int], matrix, neighbours) -> list[int]:
+    size = len(tour)
+    if size < 4:
+        return tour
+    tour = list(tour)
+    position = [0] * size
+    for index, stop in enumerate(tour):
+        position[stop] = index
+
+    def succ(stop):
+        return tour[(position[stop] + 1) % size]
+
+    def pred(stop):
+        return tour[position[stop] - 1]
+
+    def reverse(first, last):
+        # Reverses the path first..last; when it wraps around the end of
+        # the list the complementary path is reversed instead, which gives
+        # the same cycle.
+        i, j = position[first], position[last]
+        if i > j:
+            i, j = position[last] + 1, position[first] - 1
+        tour[i : j + 1] = tour[i : j + 1][::-1]
+        for index in range(i, j + 1):
+            position[tour[index]] = index
+
+    queue = deque(tour)
+    queued = [True] * size
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        for forward in (True, False):
+            b = succ(a) if forward else pred(a)
+            d_ab = matrix[a][b]
+            improved = False
+            for c in neighbours[a]:
+                gain = d_ab - matrix[a][c]
+                if gain <= 0:
+                    break
+                d = succ(c) if forward else pred(c)
+                if c == b or d == a:
+                    continue
+                if gain + matrix[c][d] - matrix[b][d] > 1e-9:
+                    if forward:
+                        reverse(b, c)
+                    else:
+                        reverse(a, d)
+                    for stop in (a, b, c, d):
+                        if not queued[stop]:
+                            queued[stop] = True
+                            queue.append(stop)
+                    improved = True
+                    break
+            if improved:
+                break
+    return tour
+
+
+class RoutePlanner:
+    def __init__(self, cache_size: int = 64, neighbours: int = 10):
+        self.cache_size = cache_size
+        self.neighbours = neighbours
+        self._matrices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matrix(self, stops):
+        # Stops are sorted so the same set of cafes hits the same entry
+        # regardless of the order it was requested in.
+        key = tuple(
+            sorted(
+                (str(identifier), float(lat), float(lon))
+                for identifier, lat, lon in stops
+            )
+        )
+        with self._lock:
+            cached = self._matrices.get(key)
+            if cached is not None:
+                self._matrices.move_to_end(key)
+                return cached
+
+        matrix = distance_matrix([(lat, lon) for _, lat, lon in key])
+        neighbours = [
+            sorted(
+                (j for j in range(len(row)) if j != i),
+                key=row.__getitem__,
+            )[: self.neighbours]
+            for i, row in enumerate(matrix)
+        ]
+        identifiers = [identifier for identifier, _, _ in key]
+        cached = (identifiers, matrix, neighbours)
+        with self._lock:
+            self._matrices[key] = cached
+            while len(self._matrices) > self.cache_size:
+                self._matrices.popitem(last=False)
+        return cached
+
+    def plan(self, stops, start=None) -> Route:
+        stops = list(stops)
+        if not stops:
+            return Route([], 0.0)
+        identifiers, matrix, neighbours = self.matrix(stops)
+        start = str(stops[0][0] if start is None else start)
+        start_index = identifiers.index(start)
+
+        tour = nearest_neighbour_tour(matrix, start_index)
+        tour = two_opt(tour, matrix, neighbours)
+        offset = tour.index(start_index)
+        tour = tour[offset:] + tour[:offset]
+
+        distance = sum(
+            matrix[tour[i - 1]][tour[i]] for i in range(len(tour))
+        )
+        return Route([identifiers[i] for i in tour], distance)
@@ -0,0 +1,91 @@
+import math
+from collections import defaultdict
+
+from geoutils.coordinates_processor import haversine
+
+METERS_PER_DEGREE = 111_320
+
+
+class GridIndex:
+    def __init__(self, cell_meters: float):
+        self.cell_meters = cell_meters
+        self.cell_degrees = cell_meters / METERS_PER_DEGREE
+        self._cells = defaultdict(list)
+        self._offsets = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def cell(self, lat: float, lon: float):
+        return (
+            math.floor(lat / self.cell_degrees),
+            math.floor(lon / self.cell_degrees),
+        )
+
+    def add(self, lat: float, lon: float, item):
+        size = self.cell_degrees
+        self._cells[(math.floor(lat / size), math.floor(lon / size))].append(
+            (lat, lon, item)
+        )
+        self._size += 1
+
+    def remove(self, lat: float, lon: float, item):
+        key = self.cell(lat, lon)
+        bucket = self._cells.get(key)
+        if bucket is None:
+            return
+        try:
+            bucket.remove((lat, lon, item))
+        except ValueError:
+            return
+        self._size -= 1
+        if not bucket:
+            del self._cells[key]
+
+    def cells(self):
+        return self._cells.items()
+
+    def neighbour_offsets(self, row: int, radius_meters: float):
+        cache_key = (row, radius_meters)
+        offsets = self._offsets.get(cache_key)
+        if offsets is None:
+            lat_span = math.ceil(radius_meters / self.cell_meters)
+            # A degree of longitude shrinks with cos(lat), so more columns
+            # have to be scanned to cover the same distance near the poles.
+            max_lat = min(
+                (abs(row) + 1 + lat_span) * self.cell_degrees,
+                89.9,
+            )
+            cos_lat = math.cos(math.radians(max_lat))
+            lon_span = math.ceil(radius_meters / (self.cell_meters * cos_lat))
+            offsets = tuple(
+                (d_row, d_col)
+                for d_row in range(-lat_span, lat_span + 1)
+                for d_col in range(-lon_span, lon_span + 1)
+            )
+            self._offsets[cache_key] = offsets
+        return offsets
+
+    def neighbour_keys(self, key, radius_meters: float):
+        row, col = key
+        for d_row, d_col in self.neighbour_offsets(row, radius_meters):
+            yield row + d_row, col + d_col
+
+    def nearby(self, lat: float, lon: float, radius_meters: float):
+        for key in self.neighbour_keys(self.cell(lat, lon), radius_meters):
+            yield from self._cells.get(key, ())
+
+    def nearest(
+        self, lat: float, lon: float, radius_meters: float, skip=None
+    ):
+        best, best_distance = None, None
+        for p_lat, p_lon, item in self.nearby(lat, lon, radius_meters):
+            if skip is not None and skip(item):
+                continue
+            distance = haversine(lat, lon, p_lat, p_lon) * 1000
+            if distance <= radius_meters and (
+                best_distance is None or distance < best_distance
+            ):
+                best, best_distance = item, distance
+        return best, best_distance
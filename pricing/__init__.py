@@ -0,0 +1,3 @@
+from pricing.currency_converter import (
+    CurrencyConverter,
+)
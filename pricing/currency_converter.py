@@ -0,0 +1,89 @@
+import time
+from typing import NamedTuple
+
+
+class _Rates(NamedTuple):
+    rates: dict
+    ids: dict
+    factors: dict
+
+
+class CurrencyConverter:
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl
+        self._state = _Rates({}, {}, {})
+        self.loaded_at = None
+        self.version = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def expired(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    def load(self, rows, version=None):
+        rates, ids = {}, {}
+        for currency_id, code, rate in rows:
+            rates[currency_id] = float(rate)
+            ids[code] = currency_id
+        # Readers hold on to the previous state until this one assignment,
+        # so a reload never shows them a half-filled table.
+        self._state = _Rates(rates, ids, {})
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _resolve(state: _Rates, currency):
+        if isinstance(currency, str):
+            try:
+                return state.ids[currency]
+            except KeyError as e:
+                raise KeyError(f"No rate for currency {currency}") from e
+        return currency
+
+    @classmethod
+    def _factors(cls, state: _Rates, target) -> dict:
+        # One multiplier per source currency, built once per target and
+        # reused until the rates are reloaded.
+        target = cls._resolve(state, target)
+        factors = state.factors.get(target)
+        if factors is None:
+            try:
+                target_rate = state.rates[target]
+            except KeyError as e:
+                raise KeyError(f"No rate for currency {target}") from e
+            factors = {
+                currency_id: rate / target_rate
+                for currency_id, rate in state.rates.items()
+            }
+            state.factors[target] = factors
+        return factors
+
+    def factors(self, target) -> dict:
+        return self._factors(self._state, target)
+
+    def convert(self, amount: float, source, target) -> float:
+        state = self._state
+        factors = self._factors(state, target)
+        return amount * factors[self._resolve(state, source)]
+
+    def convert_many(self, amounts, sources, target) -> list:
+        factors = self.factors(target)
+        return [
+            None if amount is None or source not in factors
+            else amount * factors[source]
+            for amount, source in zip(amounts, sources)
+        ]
+
+    def convert_entries(self, entries, target) -> list:
+        entries = list(entries)
+        return self.convert_many(
+            [entry.price for entry in entries],
+            [entry.currency_id for entry in entries],
+            target,
+        )
@@ -0,0 +1,96 @@
+import os
+import random
+import stat
+import tempfile
+import unittest
+from uuid import uuid4
+
+from geoutils import LocationSnapshot
+
+
+def _rows(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (
+            str(uuid4()),
+            round(rng.uniform(-90, 90), 6),
+            round(rng.uniform(-180, 180), 6),
+            rng.choice(["MOW", "LED", None]),
+            rng.choice(["RU", "KZ", None]),
+        )
+        for _ in range(count)
+    ]
+
+
+class LocationSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        rows = _rows(500)
+        self.assertEqual(LocationSnapshot.write(self.path, rows), len(rows))
+        with LocationSnapshot.load(self.path) as snapshot:
+            self.assertEqual(len(snapshot), len(rows))
+            self.assertEqual(
+                list(snapshot),
+                sorted(
+                    (
+                        (identifier, lat, lon, city or "", country or "")
+                        for identifier, lat, lon, city, country in rows
+                    ),
+                    key=lambda row: row[0].encode(),
+                ),
+            )
+
+    def test_lookup(self):
+        rows = _rows(1000, seed=1)
+        # Ids of different lengths are padded to the widest one.
+        rows += [("a", 1.5, 2.5, None, None), ("zz", -1.5, -2.5, "X", "Y")]
+        LocationSnapshot.write(self.path, rows)
+        with LocationSnapshot.load(self.path) as snapshot:
+            for identifier, lat, lon, city, country in rows:
+                position = snapshot.position(identifier)
+                self.assertIsNotNone(position)
+                self.assertEqual(snapshot.id(position), identifier)
+                self.assertEqual(snapshot.coordinates(identifier), (lat, lon))
+                self.assertEqual(snapshot.city_code(position), city or "")
+                self.assertEqual(
+                    snapshot.country_code(position), country or ""
+                )
+            self.assertIsNone(snapshot.position("missing"))
+            self.assertIsNone(snapshot.position(""))
+            self.assertIsNone(snapshot.coordinates("x" * 100))
+
+    def test_single_precision(self):
+        rows = _rows(100, seed=2)
+        LocationSnapshot.write(self.path, rows, double_precision=False)
+        with LocationSnapshot.load(self.path) as snapshot:
+            for identifier, lat, lon, _, _ in rows:
+                found_lat, found_lon = snapshot.coordinates(identifier)
+                self.assertAlmostEqual(found_lat, lat, places=4)
+                self.assertAlmostEqual(found_lon, lon, places=4)
+
+    def test_empty(self):
+        LocationSnapshot.write(self.path, [])
+        with LocationSnapshot.load(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 0)
+            self.assertEqual(list(snapshot), [])
+            self.assertIsNone(snapshot.position("missing"))
+
+    def test_file_is_world_readable(self):
+        LocationSnapshot.write(self.path, _rows(1))
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as file:
+            file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            LocationSnapshot.load(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from geoutils import RoutePlanner
+from geoutils.route_planner import (
+    distance_matrix,
+    nearest_neighbour_tour,
+    two_opt,
+)
+
+
+def _stops(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (f"cafe-{index}", rng.uniform(55.5, 56.0), rng.uniform(37.3, 37.9))
+        for index in range(count)
+    ]
+
+
+def _length(tour, matrix):
+    return sum(matrix[tour[i - 1]][tour[i]] for i in range(len(tour)))
+
+
+class TwoOptTest(unittest.TestCase):
+    def test_tour_is_permutation_and_not_longer(self):
+        for seed in range(20):
+            for count in (1, 2, 3, 4, 5, 10, 50, 200):
+                matrix = distance_matrix(
+                    [(lat, lon) for _, lat, lon in _stops(count, seed)]
+                )
+                neighbours = RoutePlanner().matrix(_stops(count, seed))[2]
+                start = seed % count
+                initial = nearest_neighbour_tour(matrix, start)
+                tour = two_opt(initial, matrix, neighbours)
+                with self.subTest(seed=seed, count=count):
+                    self.assertEqual(sorted(tour), list(range(count)))
+                    self.assertLessEqual(
+                        _length(tour, matrix),
+                        _length(initial, matrix) + 1e-9,
+                    )
+
+    def test_removes_crossing(self):
+        # The corners of a square visited across its diagonals.
+        coordinates = [(0.0, 0.0), (1.0, 1.0), (0.0, 1.0), (1.0, 0.0)]
+        matrix = distance_matrix(coordinates)
+        neighbours = [
+            sorted((j for j in range(4) if j != i), key=row.__getitem__)
+            for i, row in enumerate(matrix)
+        ]
+        tour = two_opt([0, 1, 2, 3], matrix, neighbours)
+        self.assertLess(_length(tour, matrix), _length([0, 1, 2, 3], matrix))
+
+
+class RoutePlannerTest(unittest.TestCase):
+    def test_plan_starts_at_start(self):
+        stops = _stops(100, seed=3)
+        route = RoutePlanner().plan(stops, start="cafe-42")
+        self.assertEqual(route.stops[0], "cafe-42")
+        self.assertEqual(
+            sorted(route.stops),
+            sorted(identifier for identifier, _, _ in stops),
+        )
+        self.assertGreater(route.distance_km, 0)
+
+    def test_plan_ignores_request_order(self):
+        stops = _stops(30, seed=4)
+        planner = RoutePlanner()
+        route = planner.plan(stops, start="cafe-0")
+        self.assertEqual(planner.plan(stops[::-1], start="cafe-0"), route)
+
+    def test_empty_plan(self):
+        self.assertEqual(RoutePlanner().plan([]).stops, [])
+
+
+if __name__ == "__main__":
+    unittest.main()